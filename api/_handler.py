@@ -0,0 +1,15 @@
+"""
+Single Mangum handler for the FastAPI app in api/index.py
+Every serverless entry point re-exports this instance instead of building its own
+"""
+import os
+import sys
+
+# Allow plain `from index import ...` whether Vercel loads api/ as a package or not
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mangum import Mangum
+from index import fastapi_app
+
+# No startup/shutdown hooks are registered, so skip the lifespan handshake
+handler = Mangum(fastapi_app, lifespan="off")
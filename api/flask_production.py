@@ -8,28 +8,78 @@ import os
 import uuid
 import io
 import fitz  # PyMuPDF - ONLY dependency for PDF processing
-import base64
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in for the stdlib module, used when installed
+except ImportError:
+    import base64
 import re
 import math
-from typing import Dict, List, Tuple, Any
+from functools import lru_cache
+from types import MappingProxyType
+import logging
+from typing import Dict, List, Tuple, Any, Union
 import json
+import tempfile
 
-def extract_pymupdf_metadata(pdf_content: bytes, page_num: int = None) -> Dict[str, Any]:
+logger = logging.getLogger(__name__)
+
+# Fill used to blank out the original text before redrawing it
+_WHITE = (1.0, 1.0, 1.0)
+
+# get_text("dict") flags: keep ligatures/whitespace as-is, don't invent spaces, and drop
+# off-page text. Image blocks are never requested (TEXT_PRESERVE_IMAGES stays unset).
+TEXT_FLAGS = (fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE
+              | fitz.TEXT_INHIBIT_SPACES | fitz.TEXT_MEDIABOX_CLIP)
+
+# Spooled uploads are copied and base64-encoded in chunks; the encode chunk is a multiple of 3
+UPLOAD_CHUNK_SIZE = 1 << 20
+B64_CHUNK_SIZE = 3 * (1 << 18)
+# Edited PDFs above this size are saved as incremental updates instead of being rewritten
+INCREMENTAL_SAVE_THRESHOLD = 2_000_000
+
+# Colour channels are scaled by a reciprocal instead of dividing per channel
+_INV255 = 1.0 / 255.0
+# Text whose center lies within this fraction of the page width from the page center counts as centered
+CENTER_TOLERANCE = 0.15
+
+@lru_cache(maxsize=256)
+def _int_to_rgb(color: int) -> Tuple[float, float, float]:
+    """0-1 RGB from a packed sRGB int (memoized - documents use a handful of colours)"""
+    return (((color >> 16) & 255) * _INV255, ((color >> 8) & 255) * _INV255, (color & 255) * _INV255)
+
+@lru_cache(maxsize=256)
+def _rgb255_to_unit(rgb: Tuple[int, ...]) -> Tuple[float, ...]:
+    """0-255 channels to the 0-1 range PyMuPDF draws with (memoized like _int_to_rgb)"""
+    return tuple(c * _INV255 for c in rgb)
+
+def _open_pdf(pdf_content: Union[bytes, str]) -> fitz.Document:
+    """Open a PDF from bytes or, preferably, from a path so MuPDF reads it from disk"""
+    if isinstance(pdf_content, str):
+        return fitz.open(pdf_content)
+    return fitz.open(stream=pdf_content, filetype="pdf")
+
+def _b64encode_file(path: str) -> str:
+    """Base64-encode a file without holding its raw bytes in memory all at once"""
+    with open(path, "rb") as f:
+        return "".join(base64.b64encode(chunk).decode('ascii') for chunk in iter(lambda: f.read(B64_CHUNK_SIZE), b""))
+
+def extract_pymupdf_metadata(pdf_content: Union[bytes, str], page_num: int = None) -> Dict[str, Any]:
     """
-    Extract enhanced text metadata using ONLY PyMuPDF - with safety limits for distorted PDFs
+    Extract enhanced text metadata using ONLY PyMuPDF - with safety limits for distorted PDFs.
+    pdf_content may be the PDF bytes or a path to the PDF on disk.
     """
     try:
-        doc = fitz.open(stream=pdf_content, filetype="pdf")
+        doc = _open_pdf(pdf_content)
         
         # SAFETY CHECK: Validate PDF document
         if not doc or doc.page_count == 0:
-            print("⚠️ Invalid or empty PDF document")
+            logger.warning("⚠️ Invalid or empty PDF document")
             return {}
             
-        print(f"📄 PDF opened successfully: {doc.page_count} pages")
+        logger.debug("📄 PDF opened successfully: %s pages", doc.page_count)
         
     except Exception as e:
-        print(f"❌ Failed to open PDF: {e}")
+        logger.error("❌ Failed to open PDF: %s", e)
         return {}
     
     metadata = {}
@@ -53,18 +103,18 @@ def extract_pymupdf_metadata(pdf_content: bytes, page_num: int = None) -> Dict[s
             page = doc[page_idx]
             page_items_processed = 0
             
-            print(f"🔍 Processing page {page_idx + 1}...")
+            logger.debug("🔍 Processing page %s...", page_idx + 1)
             
             # Get text with detailed font information using PyMuPDF's dict format
-            text_dict = page.get_text("dict", flags=11)
+            text_dict = page.get_text("dict", flags=TEXT_FLAGS)
             
             # SAFETY CHECK: Validate text_dict structure
             if not text_dict or "blocks" not in text_dict:
-                print(f"⚠️ Invalid text structure on page {page_idx + 1}")
+                logger.warning("⚠️ Invalid text structure on page %s", page_idx + 1)
                 continue
                 
         except Exception as e:
-            print(f"❌ Error processing page {page_idx + 1}: {e}")
+            logger.error("❌ Error processing page %s: %s", page_idx + 1, e)
             continue
         
         for block in text_dict["blocks"]:
@@ -73,10 +123,10 @@ def extract_pymupdf_metadata(pdf_content: bytes, page_num: int = None) -> Dict[s
                     for span in line["spans"]:
                         # SAFETY CHECK: Stop if we hit limits
                         if page_items_processed >= MAX_TEXT_ITEMS_PER_PAGE:
-                            print(f"⚠️ Hit per-page limit ({MAX_TEXT_ITEMS_PER_PAGE}) on page {page_idx + 1}")
+                            logger.warning("⚠️ Hit per-page limit (%s) on page %s", MAX_TEXT_ITEMS_PER_PAGE, page_idx + 1)
                             break
                         if total_items_processed >= MAX_TOTAL_TEXT_ITEMS:
-                            print(f"⚠️ Hit global limit ({MAX_TOTAL_TEXT_ITEMS}) - stopping extraction")
+                            logger.warning("⚠️ Hit global limit (%s) - stopping extraction", MAX_TOTAL_TEXT_ITEMS)
                             break
                         
                         text = span["text"].strip()
@@ -87,7 +137,7 @@ def extract_pymupdf_metadata(pdf_content: bytes, page_num: int = None) -> Dict[s
                         if len(text) < MIN_TEXT_LENGTH:  # Skip too short text
                             continue
                         if len(text) > MAX_TEXT_LENGTH:  # Skip abnormally long text
-                            print(f"⚠️ Skipping oversized text ({len(text)} chars): {text[:50]}...")
+                            logger.warning("⚠️ Skipping oversized text (%s chars): %s...", len(text), text[:50])
                             continue
                         
                         # Enhanced font analysis using PyMuPDF
@@ -99,7 +149,7 @@ def extract_pymupdf_metadata(pdf_content: bytes, page_num: int = None) -> Dict[s
                         
                         # SAFETY CHECK: Validate bbox
                         if not bbox or len(bbox) != 4:
-                            print(f"⚠️ Invalid bbox for text: {text}")
+                            logger.warning("⚠️ Invalid bbox for text: %s", text)
                             continue
                         
                         # ENHANCED BOLDNESS DETECTION using PyMuPDF flags
@@ -121,13 +171,10 @@ def extract_pymupdf_metadata(pdf_content: bytes, page_num: int = None) -> Dict[s
                         actual_height = bbox[3] - bbox[1]
                         size_ratio = actual_height / font_size if font_size > 0 else 1.0
                         
-                        # RGB Color conversion
-                        if isinstance(color, int):
-                            r = (color >> 16) & 255
-                            g = (color >> 8) & 255  
-                            b = color & 255
-                            rgb_color = (r/255.0, g/255.0, b/255.0)
-                        else:
+                        # RGB Color conversion (sRGB ints in practice; anything else falls back to black)
+                        try:
+                            rgb_color = _int_to_rgb(color)
+                        except TypeError:
                             rgb_color = (0, 0, 0)  # Default black
                         
                         # Create unique key
@@ -163,20 +210,22 @@ def extract_pymupdf_metadata(pdf_content: bytes, page_num: int = None) -> Dict[s
                 if page_items_processed >= MAX_TEXT_ITEMS_PER_PAGE:
                     break
         
-        print(f"📊 Page {page_idx + 1}: Processed {page_items_processed} text items")
+        logger.debug("📊 Page %s: Processed %s text items", page_idx + 1, page_items_processed)
         
         # Break out of page loop if hit global limit
         if total_items_processed >= MAX_TOTAL_TEXT_ITEMS:
             break
     
-    print(f"✅ Total extraction: {total_items_processed} text items from {len(pages_to_process)} pages")
+    logger.debug("✅ Total extraction: %s text items from %s pages", total_items_processed, len(pages_to_process))
     
     doc.close()
     return metadata
 
-def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, page_width: float, all_text_items: list) -> dict:
+def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, page_width: float, all_text_items: list,
+                        center_tolerance: float = None) -> dict:
     """
-    PROPER CENTER PRESERVATION: Keep text centered on original element with context detection
+    PROPER CENTER PRESERVATION: Keep text centered on original element with context detection.
+    center_tolerance is page_width * CENTER_TOLERANCE; callers that already computed it can pass it in.
     """
     x0, y0, x1, y1 = bbox
     
@@ -199,7 +248,9 @@ def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, p
     page_center_x = page_width / 2
     
     # Check if original text was center-positioned (within 15% of page center)
-    is_center_positioned = abs(original_center_x - page_center_x) < (page_width * 0.15)
+    if center_tolerance is None:
+        center_tolerance = page_width * CENTER_TOLERANCE
+    is_center_positioned = abs(original_center_x - page_center_x) < center_tolerance
     
     if is_center_positioned:
         # PRESERVE THE EXACT CENTER POINT of the original element
@@ -212,22 +263,22 @@ def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, p
             shift = -new_x0
             new_x0 = 0
             new_x1 = new_text_width
-            print(f"   Adjusted for page boundary: shifted right by {shift:.2f}")
+            logger.debug("   Adjusted for page boundary: shifted right by %.2f", shift)
         elif new_x1 > page_width:
             shift = new_x1 - page_width
             new_x1 = page_width
             new_x0 = page_width - new_text_width
-            print(f"   Adjusted for page boundary: shifted left by {shift:.2f}")
+            logger.debug("   Adjusted for page boundary: shifted left by %.2f", shift)
         
         new_bbox = [new_x0, y0, new_x1, y1]
         
-        print(f"🎯 CENTER PRESERVATION:")
-        print(f"   Original element center: {original_center_x:.2f}")
-        print(f"   Original bbox: [{x0:.2f}, {y0:.2f}, {x1:.2f}, {y1:.2f}]")
-        print(f"   New text width: {new_text_width:.2f}")
-        print(f"   New bbox: [{new_x0:.2f}, {y0:.2f}, {new_x1:.2f}, {y1:.2f}]")
-        print(f"   New element center: {(new_x0 + new_x1) / 2:.2f}")
-        print(f"   Center preserved: {abs(original_center_x - (new_x0 + new_x1) / 2) < 0.1}")
+        logger.debug("🎯 CENTER PRESERVATION:")
+        logger.debug("   Original element center: %.2f", original_center_x)
+        logger.debug("   Original bbox: [%.2f, %.2f, %.2f, %.2f]", x0, y0, x1, y1)
+        logger.debug("   New text width: %.2f", new_text_width)
+        logger.debug("   New bbox: [%.2f, %.2f, %.2f, %.2f]", new_x0, y0, new_x1, y1)
+        logger.debug("   New element center: %.2f", (new_x0 + new_x1) / 2)
+        logger.debug("   Center preserved: %s", abs(original_center_x - (new_x0 + new_x1) / 2) < 0.1)
         
         return {
             'strategy': 'center_preserve',
@@ -246,9 +297,9 @@ def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, p
         
         new_bbox = [new_x0, y0, new_x1, y1]
         
-        print(f"📝 LEFT-ALIGNED PRESERVATION:")
-        print(f"   Original bbox: [{x0:.2f}, {y0:.2f}, {x1:.2f}, {y1:.2f}]")
-        print(f"   New bbox: [{new_x0:.2f}, {y0:.2f}, {new_x1:.2f}, {y1:.2f}]")
+        logger.debug("📝 LEFT-ALIGNED PRESERVATION:")
+        logger.debug("   Original bbox: [%.2f, %.2f, %.2f, %.2f]", x0, y0, x1, y1)
+        logger.debug("   New bbox: [%.2f, %.2f, %.2f, %.2f]", new_x0, y0, new_x1, y1)
         
         return {
             'strategy': 'left_preserve',
@@ -257,47 +308,46 @@ def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, p
         }
 
 
+# One compiled scan finds every family keyword in a font name; anything else is Helvetica
+_FONT_FAMILY_RE = re.compile(r"(?P<times>times|serif|roman)|(?P<cour>courier|mono|consolas|menlo)")
+_FAMILY_PRIORITY = ("times", "cour")
+
+# (family, is_bold, is_italic) -> Base-14 font; bold italic uses the bold face, Courier has no italic here
+_BASE14_VARIANTS = MappingProxyType({
+    ("helv", False, False): "helv",
+    ("helv", True, False): "hebo",
+    ("helv", False, True): "heit",
+    ("helv", True, True): "hebo",
+    ("times", False, False): "tiro",
+    ("times", True, False): "tibo",
+    ("times", False, True): "tiit",
+    ("times", True, True): "tibo",
+    ("cour", False, False): "cour",
+    ("cour", True, False): "cobo",
+    ("cour", False, True): "cour",
+    ("cour", True, True): "cobo",
+})
+
+@lru_cache(maxsize=1024)
 def map_to_pymupdf_font(font_name: str, is_bold: bool = False, is_italic: bool = False) -> str:
     """
-    Map font names to PyMuPDF built-in fonts with enhanced mapping
+    Map font names to PyMuPDF built-in fonts with enhanced mapping (memoized - edits reuse few fonts)
     """
-    font_name_lower = font_name.lower()
-    
-    # Enhanced font mapping with style consideration
-    if any(serif in font_name_lower for serif in ['times', 'serif', 'roman']):
-        if is_bold and is_italic:
-            return "tibo"  # Times Bold Italic
-        elif is_bold:
-            return "tibo"  # Times Bold (closest match)
-        elif is_italic:
-            return "tibo"  # Times Italic (closest match)
-        else:
-            return "times"  # Times Roman
-    
-    elif any(mono in font_name_lower for mono in ['courier', 'mono', 'consolas', 'menlo']):
-        if is_bold:
-            return "cobo"  # Courier Bold
-        else:
-            return "cour"  # Courier
-    
-    else:  # Default to Helvetica family
-        if is_bold and is_italic:
-            return "helv"  # Helvetica (closest available)
-        elif is_bold:
-            return "hebo"  # Helvetica Bold
-        elif is_italic:
-            return "heob"  # Helvetica Oblique
-        else:
-            return "helv"  # Helvetica
+    families = {match.lastgroup for match in _FONT_FAMILY_RE.finditer(font_name.lower())}
+    family = next((f for f in _FAMILY_PRIORITY if f in families), "helv")
+    return _BASE14_VARIANTS[(family, bool(is_bold), bool(is_italic))]
 
 # Create Flask app
 app = Flask(__name__)
 
+# Per-span/edit debug output is off in production; set LOG_LEVEL=DEBUG to see it
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+
 # Get the frontend URL from environment variable (for Vercel)
 frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
 # Add CORS middleware - simplified for reliability
-print(f"🌐 Configured CORS for frontend: {frontend_url}")
+logger.debug("🌐 Configured CORS for frontend: %s", frontend_url)
 CORS(app, origins="*", methods=["*"], allow_headers=["*"])
 
 @app.after_request
@@ -339,52 +389,58 @@ def upload_pdf():
     """
     if request.method == 'OPTIONS':
         return '', 200
-        
+    
+    tmp_path = None
     try:
-        print("🚀 ADVANCED PDF PROCESSING: Starting upload with enhanced metadata extraction")
+        logger.debug("🚀 ADVANCED PDF PROCESSING: Starting upload with enhanced metadata extraction")
         
         # Get uploaded file
         if 'file' not in request.files:
             return jsonify({"error": "No file uploaded"}), 400
             
         file = request.files['file']
-        file_content = file.read()
         file_id = str(uuid.uuid4())
         
-        print(f"📄 Processing PDF: {len(file_content)} bytes, ID: {file_id}")
+        # Stream the upload to disk and let MuPDF open it by path instead of holding it in memory
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            tmp_path = tmp.name
+            file.save(tmp, buffer_size=UPLOAD_CHUNK_SIZE)
+            file_size = tmp.tell()
+        
+        logger.debug("📄 Processing PDF: %s bytes, ID: %s", file_size, file_id)
         
         # Skip embedded font extraction - using PyMuPDF-only approach
         embedded_fonts = {}
-        print(f"⚠️ Font extraction warning: Using PyMuPDF-only approach")
+        logger.debug("⚠️ Font extraction warning: Using PyMuPDF-only approach")
         
         # STEP 2: Use ENHANCED metadata extraction with visual boldness analysis
-        print("🔍 STARTING ENHANCED METADATA EXTRACTION...")
+        logger.debug("🔍 STARTING ENHANCED METADATA EXTRACTION...")
         
         try:
             # Extract text metadata from ALL pages - OPTIMIZED: Open PDF only once
             all_metadata = []
             
-            print("🔍 OPTIMIZED PROCESSING: Opening PDF once for all pages...")
+            logger.debug("🔍 OPTIMIZED PROCESSING: Opening PDF once for all pages...")
             # Use PyMuPDF-only metadata extraction for ALL pages at once
-            page_metadata = extract_pymupdf_metadata(file_content, page_num=None)  # Process all pages
+            page_metadata = extract_pymupdf_metadata(tmp_path, page_num=None)  # Process all pages
             if page_metadata:
                 # page_metadata is a dict, convert to list of metadata items
                 for key, metadata in page_metadata.items():
                     all_metadata.append(metadata)
                     
-            print(f"📄 Processed all pages in single pass: {len(all_metadata)} text items found")
+            logger.debug("📄 Processed all pages in single pass: %s text items found", len(all_metadata))
             
             if not all_metadata:
-                print("⚠️ No text metadata extracted - PDF may be image-based or corrupted")
-                print("📄 Attempting basic page count extraction...")
+                logger.warning("⚠️ No text metadata extracted - PDF may be image-based or corrupted")
+                logger.debug("📄 Attempting basic page count extraction...")
                 
                 # Fallback: Try to get page count even if no text is found
                 try:
-                    doc = fitz.open(stream=file_content, filetype="pdf")
+                    doc = fitz.open(tmp_path)
                     page_count = len(doc)
                     doc.close()
                     
-                    print(f"📄 Found {page_count} pages with no extractable text")
+                    logger.debug("📄 Found %s pages with no extractable text", page_count)
                     
                     # Return basic PDF info without text items
                     return jsonify({
@@ -393,157 +449,156 @@ def upload_pdf():
                         "text_metadata": {},
                         "total_items": 0,
                         "processing_method": "basic_fallback",
-                        "pdf_data": base64.b64encode(file_content).decode('utf-8'),
+                        "pdf_data": _b64encode_file(tmp_path),
                         "embedded_fonts": {},
                         "message": f"PDF processed but no text extracted. {page_count} pages found.",
                         "page_count": page_count
                     }), 200
                     
                 except Exception as fallback_error:
-                    print(f"❌ Fallback page count extraction failed: {fallback_error}")
+                    logger.error("❌ Fallback page count extraction failed: %s", fallback_error)
                     return jsonify({"error": f"PDF processing failed completely: {str(fallback_error)}"}), 500
             
             text_items = []
             text_metadata = {}
             
-            print(f"📊 ENHANCED EXTRACTION: Found {len(all_metadata)} text items with full metadata")
+            logger.debug("📊 ENHANCED EXTRACTION: Found %s text items with full metadata", len(all_metadata))
             
             for i, metadata in enumerate(all_metadata):
                 metadata_key = f"text_item_{i+1}"
                 
+                # Each field is read once and shared by the display item and the editing metadata
+                text, bbox, page_no = metadata["text"], metadata["bbox"], metadata["page"]
+                font, size, flags = metadata["clean_font_name"], metadata["font_size"], metadata["flags"]
+                is_bold, is_italic = metadata["is_bold"], metadata["is_italic"]
+                color, visual_boldness = metadata["color_int"], metadata["visual_boldness_score"]
+                
                 # Create text item for frontend display
-                text_item = {
-                    "text": metadata["text"],
-                    "page": metadata["page"],  # Use actual page number from metadata
-                    "x": metadata["bbox"][0],
-                    "y": metadata["bbox"][1],
-                    "width": metadata["bbox"][2] - metadata["bbox"][0],  # Calculate width from bbox
-                    "height": metadata["bbox"][3] - metadata["bbox"][1],  # Calculate height from bbox
-                    "font": metadata["clean_font_name"],
-                    "size": metadata["font_size"],
+                text_items.append({
+                    "text": text,
+                    "page": page_no,  # Use actual page number from metadata
+                    "x": bbox[0],
+                    "y": bbox[1],
+                    "width": bbox[2] - bbox[0],  # Calculate width from bbox
+                    "height": bbox[3] - bbox[1],  # Calculate height from bbox
+                    "font": font,
+                    "size": size,
                     "metadata_key": metadata_key,
-                    "color": metadata["color_int"],
-                    "flags": metadata["flags"],
-                    "is_bold": metadata["is_bold"],
-                    "is_italic": metadata["is_italic"],
-                    "visual_boldness": metadata["visual_boldness_score"]
-                }
+                    "color": color,
+                    "flags": flags,
+                    "is_bold": is_bold,
+                    "is_italic": is_italic,
+                    "visual_boldness": visual_boldness
+                })
                 
                 # Store COMPREHENSIVE metadata for editing
                 text_metadata[metadata_key] = {
                     # Basic text properties
-                    "text": metadata["text"],
-                    "bbox": metadata["bbox"],
-                    "page": metadata["page"],
+                    "text": text,
+                    "bbox": bbox,
+                    "page": page_no,
                     
                     # Font properties
-                    "font": metadata["clean_font_name"],
-                    "size": metadata["font_size"],
-                    "flags": metadata["flags"],
+                    "font": font,
+                    "size": size,
+                    "flags": flags,
                     
                     # Enhanced boldness detection
-                    "is_bold": metadata["is_bold"],
-                    "visual_boldness_score": metadata["visual_boldness_score"],
+                    "is_bold": is_bold,
+                    "visual_boldness_score": visual_boldness,
                     
                     # Style properties  
-                    "is_italic": metadata["is_italic"],
+                    "is_italic": is_italic,
                     
                     # Color and rendering
-                    "color": metadata["color_int"],
-                    "color_rgb": [int(c*255) for c in metadata["color"]],  # Convert back to RGB 0-255
+                    "color": color,
+                    "color_rgb": [round(c * 255) for c in metadata["color"]],  # Back to RGB 0-255; round, since c * 255 can land just below the integer
                     
                     # Spacing and positioning (using defaults for now)
                     "char_spacing": 0.0,
                     "word_spacing": 0.0
                 }
-                
-                text_items.append(text_item)
         
         except Exception as extraction_error:
-            print(f"❌ Enhanced extraction failed: {extraction_error}")
-            print("🔄 Falling back to basic PyMuPDF extraction...")
+            logger.error("❌ Enhanced extraction failed: %s", extraction_error)
+            logger.debug("🔄 Falling back to basic PyMuPDF extraction...")
+            
+            # Fallback to basic extraction: spans flattened once, arithmetic done column-wise.
+            # numpy is imported here so the common path never pays for loading it
+            import numpy as np
+            
+            pdf_document = fitz.open(tmp_path)
+            try:
+                spans = [
+                    (page_num + 1, span)
+                    for page_num in range(len(pdf_document))
+                    for block in pdf_document[page_num].get_text("dict", flags=TEXT_FLAGS)["blocks"] if "lines" in block
+                    for line in block["lines"]
+                    for span in line["spans"] if span["text"].strip()
+                ]
+            finally:
+                pdf_document.close()
             
-            # Fallback to basic extraction
-            pdf_document = fitz.open(stream=file_content, filetype="pdf")
             text_items = []
             text_metadata = {}
-            item_counter = 0
             
-            for page_num in range(len(pdf_document)):
-                page = pdf_document[page_num]
-                text_dict = page.get_text("dict", flags=11)
+            if spans:
+                bbox_arr = np.asarray([span["bbox"] for _, span in spans], dtype=np.float64)
+                flags_arr = np.asarray([span["flags"] for _, span in spans], dtype=np.int64)
+                color_arr = np.asarray([span["color"] for _, span in spans], dtype=np.int64)
+                widths = (bbox_arr[:, 2] - bbox_arr[:, 0]).tolist()
+                heights = (bbox_arr[:, 3] - bbox_arr[:, 1]).tolist()
+                is_bold_arr = ((flags_arr & 16) != 0).tolist()
+                is_italic_arr = ((flags_arr & 2) != 0).tolist()
+                # RGB color conversion for every span at once
+                rgb_arr = ((color_arr[:, None] >> np.array([16, 8, 0])) & 255).tolist()
                 
-                for block in text_dict["blocks"]:
-                    if "lines" in block:
-                        for line in block["lines"]:
-                            for span in line["spans"]:
-                                if span["text"].strip():
-                                    item_counter += 1
-                                    metadata_key = f"text_item_{item_counter}"
-                                    
-                                    font_info = span["font"]
-                                    font_size = span["size"]
-                                    font_flags = span["flags"]
-                                    text_color = span["color"]
-                                    bbox = span["bbox"]
-                                    
-                                    is_bold = bool(font_flags & 16)
-                                    is_italic = bool(font_flags & 2)
-                                    
-                                    text_item = {
-                                        "text": span["text"],
-                                        "page": page_num + 1,
-                                        "x": bbox[0],
-                                        "y": bbox[1],
-                                        "width": bbox[2] - bbox[0],
-                                        "height": bbox[3] - bbox[1],
-                                        "font": font_info,
-                                        "size": font_size,
-                                        "metadata_key": metadata_key,
-                                        "color": text_color,
-                                        "flags": font_flags,
-                                        "is_bold": is_bold,
-                                        "is_italic": is_italic,
-                                        "visual_boldness": 50.0 if is_bold else 0.0
-                                    }
-                                    
-                                    # RGB color conversion for fallback
-                                    if isinstance(text_color, int):
-                                        r = (text_color >> 16) & 255
-                                        g = (text_color >> 8) & 255
-                                        b = text_color & 255
-                                        color_rgb = [r, g, b]
-                                    else:
-                                        color_rgb = [0, 0, 0]
-                                    
-                                    # Store metadata for editing
-                                    text_metadata[metadata_key] = {
-                                        "text": span["text"],
-                                        "bbox": list(bbox),
-                                        "page": page_num + 1,
-                                        "font": font_info,
-                                        "size": font_size,
-                                        "flags": font_flags,
-                                        "is_bold": is_bold,
-                                        "is_italic": is_italic,
-                                        "color": text_color,
-                                        "color_rgb": color_rgb,
-                                        "visual_boldness_score": 50.0 if is_bold else 0.0,
-                                        "char_spacing": 0.0,
-                                        "word_spacing": 0.0
-                                    }
-                                    
-                                    text_items.append(text_item)
-                                    
-                                    print(f"📝 BASIC: '{span['text'][:20]}' -> Font: {font_info}, Size: {font_size}, Bold: {is_bold}")
+                for item_counter, ((page_no, span), width, height, is_bold, is_italic, color_rgb) in enumerate(
+                        zip(spans, widths, heights, is_bold_arr, is_italic_arr, rgb_arr), 1):
+                    metadata_key = f"text_item_{item_counter}"
+                    bbox = span["bbox"]
+                    visual_boldness = 50.0 if is_bold else 0.0
+                    
+                    text_items.append({
+                        "text": span["text"],
+                        "page": page_no,
+                        "x": bbox[0],
+                        "y": bbox[1],
+                        "width": width,
+                        "height": height,
+                        "font": span["font"],
+                        "size": span["size"],
+                        "metadata_key": metadata_key,
+                        "color": span["color"],
+                        "flags": span["flags"],
+                        "is_bold": is_bold,
+                        "is_italic": is_italic,
+                        "visual_boldness": visual_boldness
+                    })
+                    
+                    # Store metadata for editing
+                    text_metadata[metadata_key] = {
+                        "text": span["text"],
+                        "bbox": list(bbox),
+                        "page": page_no,
+                        "font": span["font"],
+                        "size": span["size"],
+                        "flags": span["flags"],
+                        "is_bold": is_bold,
+                        "is_italic": is_italic,
+                        "color": span["color"],
+                        "color_rgb": color_rgb,
+                        "visual_boldness_score": visual_boldness,
+                        "char_spacing": 0.0,
+                        "word_spacing": 0.0
+                    }
             
-            pdf_document.close()
-            print(f"✅ FALLBACK extraction complete: {len(text_items)} items")
+            logger.debug("✅ FALLBACK extraction complete: %s items", len(text_items))
         
-        print(f"✅ ADVANCED PDF processing complete: {len(text_items)} text items, {len(embedded_fonts)} embedded fonts")
+        logger.debug("✅ ADVANCED PDF processing complete: %s text items, %s embedded fonts", len(text_items), len(embedded_fonts))
         
         # Encode PDF data for stateless frontend operations
-        pdf_data_base64 = base64.b64encode(file_content).decode('utf-8')
+        pdf_data_base64 = _b64encode_file(tmp_path)
         
         return jsonify({
             "file_id": file_id,
@@ -556,13 +611,174 @@ def upload_pdf():
         })
         
     except Exception as e:
-        print(f"❌ Upload failed: {e}")
+        logger.error("❌ Upload failed: %s", e)
         return jsonify({"error": f"Upload processing failed: {str(e)}"}), 500
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+def _plan_text_edit(pymupdf_page: fitz.Page, text_metadata: Dict[str, Any], page: int, metadata_key: str, new_text: str) -> Dict[str, Any]:
+    """
+    Work out where and how one edit is drawn (clear rect, insertion point, font, colour) without touching the page yet
+    """
+    metadata = text_metadata[metadata_key]
+    logger.debug("🔍 EDIT DEBUG: Found metadata for %s", metadata_key)
+    logger.debug("🔍 EDIT DEBUG: metadata keys = %s", metadata.keys())
+    
+    # Debug color extraction
+    if 'color_rgb' in metadata:
+        logger.debug("🔍 EDIT DEBUG: color_rgb = %s", metadata['color_rgb'])
+    
+    # Extract information from metadata
+    original_text = metadata["text"]
+    original_bbox = metadata["bbox"]
+    font_name = metadata["font"]
+    font_size = metadata["size"]
+    
+    # Enhanced boldness detection with fallback values
+    is_bold = metadata.get("is_bold", False)
+    is_italic = metadata.get("is_italic", False)
+    visual_boldness = metadata.get("visual_boldness_score", 0)
+    
+    logger.debug("🎯 EDITING: '%s' -> '%s'", original_text, new_text)
+    logger.debug("📏 Original Position: %s, Font: %s, Size: %s", original_bbox, font_name, font_size)
+    logger.debug("🎨 Style: Bold=%s, Italic=%s, Visual Boldness=%s", is_bold, is_italic, visual_boldness)
+    
+    # 🧠 INTELLIGENT POSITIONING: Simple context analysis using PyMuPDF
+    logger.debug("🧠 ANALYZING TEXT CONTEXT...")
+    try:
+        # Get page dimensions first
+        page_width = pymupdf_page.rect.width
+        
+        # Page context comes from the metadata the client already holds, not a fresh parse of the PDF
+        all_text_items = [item for item in text_metadata.values() if item.get("page") == page]
+        
+        # Simple context analysis; the center test is computed once and shared with the aligner
+        center_tolerance = page_width * CENTER_TOLERANCE
+        is_near_center = abs((original_bbox[0] + original_bbox[2])/2 - page_width/2) < center_tolerance
+        text_context = {
+            'alignment': 'center' if is_near_center else 'left',
+            'is_near_center': is_near_center,
+            'is_list_item': False,  # Added missing variable
+            'is_header': False,     # Added missing variable  
+            'is_justified': False,  # Added missing variable
+            'spacing_analysis': {'has_adequate_space': True},
+            'context_items': len(all_text_items)
+        }
+        
+        logger.debug("📊 CONTEXT ANALYSIS:")
+        logger.debug("   Alignment: %s", text_context['alignment'])
+        logger.debug("   List Item: %s", text_context['is_list_item'])
+        logger.debug("   Header: %s", text_context['is_header'])
+        logger.debug("   Justified: %s", text_context['is_justified'])
+        
+        # USE NEW SMART ALIGNMENT SYSTEM
+        # Get all text items for context (simplified for now)
+        all_text_items = [{'x': original_bbox[0], 'y': original_bbox[1], 'text': original_text}]
+        
+        smart_alignment = get_smart_alignment(
+            text=new_text,
+            old_text=original_text, 
+            line_text=original_text,  # Using original text as line text for now
+            bbox=original_bbox,
+            page_width=page_width,
+            all_text_items=all_text_items,
+            center_tolerance=center_tolerance
+        )
+        
+        logger.debug("🎯 SMART ALIGNMENT STRATEGY: %s", smart_alignment['strategy'])
+        logger.debug("📘 REASONING: %s", smart_alignment['reasoning'])
+        logger.debug("📏 New Position: %s", smart_alignment['new_bbox'])
+        
+        # Use the smart alignment result
+        new_bbox = smart_alignment['new_bbox']
+        positioning_strategy = smart_alignment['strategy']
+        
+    except Exception as e:
+        logger.warning("⚠️  Intelligent positioning failed: %s", e)
+        logger.debug("🔄 Falling back to original position")
+        new_bbox = original_bbox
+        positioning_strategy = "fallback"
+    
+    # Determine effective font weight based on multiple factors
+    # High visual boldness score or explicit bold flag should result in bold text
+    effective_bold = is_bold or (visual_boldness > 50.0)
+    
+    logger.debug("🔍 BOLDNESS ANALYSIS:")
+    logger.debug("   Flag Bold: %s", is_bold)
+    logger.debug("   Visual Boldness Score: %s", visual_boldness)
+    logger.debug("   Effective Bold: %s", effective_bold)
+    
+    # Map font to PyMuPDF font with proper boldness
+    pymupdf_font = map_to_pymupdf_font(font_name, effective_bold, is_italic)
+    
+    # Get original color and spacing from metadata
+    original_color_rgb = metadata.get("color_rgb", [0, 0, 0])  # Default to black if not found
+    original_color_normalized = _rgb255_to_unit(tuple(original_color_rgb))  # PyMuPDF uses 0-1 range
+    
+    # Extract spacing information for better text rendering
+    char_spacing = metadata.get("char_spacing", 0.0)
+    word_spacing = metadata.get("word_spacing", 0.0)
+    
+    logger.debug("🎨 Using original color: RGB%s -> Normalized%s", original_color_rgb, original_color_normalized)
+    logger.debug("📏 Character spacing: %s, Word spacing: %s", char_spacing, word_spacing)
+    
+    # For PyMuPDF, the text insertion point should be at the bottom-left of where we want the text
+    # So we use the smart alignment X coordinate and keep the original baseline Y (bottom of original text)
+    text_point = fitz.Point(new_bbox[0], original_bbox[3])
+    
+    logger.debug("📍 SMART ALIGNMENT POSITIONING:")
+    logger.debug("   Original bbox: %s", original_bbox)
+    logger.debug("   Smart alignment bbox: %s", new_bbox)
+    logger.debug("   Text insertion point: (%.2f, %.2f)", text_point.x, text_point.y)
+    logger.debug("   Strategy: %s", positioning_strategy)
+    logger.debug("   X shift: %.2f", text_point.x - original_bbox[0])
+    logger.debug("   Y unchanged (baseline preserved)")
+    
+    # Determine render mode based on boldness intensity
+    # For very high visual boldness, use stroke rendering for extra boldness
+    render_mode = 0  # Default: fill text
+    if visual_boldness > 75.0:
+        render_mode = 2  # Fill and stroke for extra boldness
+    
+    return {
+        "clear_rect": fitz.Rect(original_bbox),
+        "text_point": text_point,
+        "new_text": new_text,
+        "font_size": font_size,
+        "font": pymupdf_font,
+        "color": original_color_normalized,
+        "render_mode": render_mode,
+        "details": {
+            "original_text": original_text,
+            "new_text": new_text,
+            "font_used": pymupdf_font,
+            "positioning_strategy": positioning_strategy,
+            "color_preserved": original_color_rgb,
+            "effective_bold": effective_bold,
+            "visual_boldness_score": visual_boldness
+        }
+    }
+
+def _insert_planned_text(pymupdf_page: fitz.Page, plan: Dict[str, Any]) -> None:
+    """Draw a planned edit's new text"""
+    pymupdf_page.insert_text(
+        plan["text_point"],
+        plan["new_text"],
+        fontsize=plan["font_size"],
+        fontname=plan["font"],
+        color=plan["color"],
+        render_mode=plan["render_mode"]
+    )
+    logger.debug("✅ Text successfully replaced with INTELLIGENT POSITIONING + PRECISE FONT MATCHING")
+    logger.debug("   Font: %s, Size: %spt, Position: (%.2f, %.2f)", plan["font"], plan["font_size"], plan["text_point"].x, plan["text_point"].y)
 
 @app.route('/pdf/<file_id>/edit', methods=['POST', 'OPTIONS'])
 def edit_text(file_id):
     """
-    ADVANCED text editing with intelligent positioning and enhanced boldness
+    ADVANCED text editing with intelligent positioning and enhanced boldness.
+    Accepts one edit (page/metadata_key/new_text) or a list of them under "edits",
+    applied with a single PDF open and save.
     """
     if request.method == 'OPTIONS':
         response = Response()
@@ -570,222 +786,105 @@ def edit_text(file_id):
         response.headers['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
         response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
         return response, 200
-        
+    
+    tmp_path = None
     try:
-        print(f"🚀 ADVANCED EDITING: Starting text edit for file_id: {file_id}")
-        
-        # Get request data
-        data = request.get_json()
-        page = data['page']
-        metadata_key = data['metadata_key']
-        new_text = data['new_text']
-        pdf_data = data['pdf_data']
+        logger.debug("🚀 ADVANCED EDITING: Starting text edit for file_id: %s", file_id)
+        
+        # Get request data: JSON with the PDF base64-encoded in pdf_data, or multipart/form-data with the PDF
+        # as a binary "pdf_file" part (no base64 inflation or decode) and the other fields as form values
+        pdf_file = request.files.get('pdf_file')
+        if pdf_file is not None:
+            form = request.form
+            data = {'text_metadata': json.loads(form['text_metadata'])}
+            if 'edits' in form:
+                data['edits'] = json.loads(form['edits'])
+            else:
+                data.update(page=int(form['page']), metadata_key=form['metadata_key'], new_text=form['new_text'])
+        else:
+            data = request.get_json()
         text_metadata = data['text_metadata']
+        is_batch = 'edits' in data
+        edits = data['edits'] if is_batch else [
+            {'page': data['page'], 'metadata_key': data['metadata_key'], 'new_text': data['new_text']}
+        ]
         
-        print(f"📝 Edit request - page: {page}, metadata_key: {metadata_key}")
-        
-        # Decode the PDF data
-        pdf_content = base64.b64decode(pdf_data)
+        logger.debug("📝 Edit request - %s edit(s): %s", len(edits), [edit['metadata_key'] for edit in edits])
         
         # Debug: Check text_metadata structure
-        print(f"🔍 EDIT DEBUG: text_metadata type = {type(text_metadata)}")
-        print(f"🔍 EDIT DEBUG: text_metadata keys = {list(text_metadata.keys())}")
-        
-        # Get metadata for the specific text item
-        if metadata_key not in text_metadata:
-            return jsonify({"error": f"Metadata key '{metadata_key}' not found"}), 400
-        
-        metadata = text_metadata[metadata_key]
-        print(f"🔍 EDIT DEBUG: Found metadata for {metadata_key}")
-        print(f"🔍 EDIT DEBUG: metadata keys = {list(metadata.keys())}")
-        
-        # Debug color extraction
-        if 'color_rgb' in metadata:
-            print(f"🔍 EDIT DEBUG: color_rgb = {metadata['color_rgb']}")
-        
-        # Extract information from metadata
-        original_text = metadata["text"]
-        original_bbox = metadata["bbox"]
-        font_name = metadata["font"]
-        font_size = metadata["size"]
-        
-        # Enhanced boldness detection with fallback values
-        is_bold = metadata.get("is_bold", False)
-        is_italic = metadata.get("is_italic", False)
-        visual_boldness = metadata.get("visual_boldness_score", 0)
-        
-        print(f"🎯 EDITING: '{original_text}' -> '{new_text}'")
-        print(f"📏 Original Position: {original_bbox}, Font: {font_name}, Size: {font_size}")
-        print(f"🎨 Style: Bold={is_bold}, Italic={is_italic}, Visual Boldness={visual_boldness}")
-        
-        # Open PDF for editing
-        pymupdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
-        pymupdf_page = pymupdf_doc[page - 1]  # Convert to 0-based index
-        
-        # 🧠 INTELLIGENT POSITIONING: Simple context analysis using PyMuPDF
-        print(f"🧠 ANALYZING TEXT CONTEXT...")
-        try:
-            # Get page dimensions first
-            page_width = pymupdf_page.rect.width
-            page_height = pymupdf_page.rect.height
-            
-            # Get page context for intelligent positioning
-            page_metadata = extract_pymupdf_metadata(pdf_content, page_num=page - 1)
-            all_text_items = list(page_metadata.values())
-            
-            # Simple context analysis
-            text_context = {
-                'alignment': 'center' if abs((original_bbox[0] + original_bbox[2])/2 - page_width/2) < page_width * 0.15 else 'left',
-                'is_near_center': abs((original_bbox[0] + original_bbox[2])/2 - page_width/2) < page_width * 0.15,
-                'is_list_item': False,  # Added missing variable
-                'is_header': False,     # Added missing variable  
-                'is_justified': False,  # Added missing variable
-                'spacing_analysis': {'has_adequate_space': True},
-                'context_items': len(all_text_items)
-            }
-            
-            print(f"📊 CONTEXT ANALYSIS:")
-            print(f"   Alignment: {text_context['alignment']}")
-            print(f"   List Item: {text_context['is_list_item']}")
-            print(f"   Header: {text_context['is_header']}")
-            print(f"   Justified: {text_context['is_justified']}")
-            
-            # USE NEW SMART ALIGNMENT SYSTEM
-            # Get all text items for context (simplified for now)
-            all_text_items = [{'x': original_bbox[0], 'y': original_bbox[1], 'text': original_text}]
-            
-            smart_alignment = get_smart_alignment(
-                text=new_text,
-                old_text=original_text, 
-                line_text=original_text,  # Using original text as line text for now
-                bbox=original_bbox,
-                page_width=page_width,
-                all_text_items=all_text_items
-            )
+        logger.debug("🔍 EDIT DEBUG: text_metadata type = %s", type(text_metadata))
+        logger.debug("🔍 EDIT DEBUG: text_metadata keys = %s", len(text_metadata))
+        
+        # Get metadata for every text item before the PDF is even decoded
+        for edit in edits:
+            if edit['metadata_key'] not in text_metadata:
+                return jsonify({"error": f"Metadata key '{edit['metadata_key']}' not found"}), 400
+        
+        if pdf_file is not None:
+            # Binary part streams straight to disk, so the edits can be saved incrementally
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+                tmp_path = tmp.name
+                pdf_file.save(tmp, buffer_size=UPLOAD_CHUNK_SIZE)
+            pymupdf_doc = fitz.open(tmp_path)
+        else:
+            # Decode the PDF data
+            pdf_content = base64.b64decode(data['pdf_data'])
             
-            print(f"🎯 SMART ALIGNMENT STRATEGY: {smart_alignment['strategy']}")
-            print(f"📘 REASONING: {smart_alignment['reasoning']}")
-            print(f"📏 New Position: {smart_alignment['new_bbox']}")
+            # Open PDF for editing; large files go through disk so the edits can be saved incrementally
+            if len(pdf_content) > INCREMENTAL_SAVE_THRESHOLD:
+                with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+                    tmp_path = tmp.name
+                    tmp.write(pdf_content)
+                pymupdf_doc = fitz.open(tmp_path)
+            else:
+                pymupdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
+        
+        try:
+            planned = []
+            for edit in edits:
+                pymupdf_page = pymupdf_doc[edit['page'] - 1]  # Convert to 0-based index
+                plan = _plan_text_edit(pymupdf_page, text_metadata, edit['page'], edit['metadata_key'], edit['new_text'])
+                # Clear the original text by drawing a white rectangle
+                pymupdf_page.draw_rect(plan["clear_rect"], color=None, fill=_WHITE)
+                planned.append((pymupdf_page, plan))
             
-            # Use the smart alignment result
-            new_bbox = smart_alignment['new_bbox']
-            positioning_strategy = smart_alignment['strategy']
+            # Text goes in after every target is cleared, so no white box covers an earlier edit's text
+            for pymupdf_page, plan in planned:
+                _insert_planned_text(pymupdf_page, plan)
             
-        except Exception as e:
-            print(f"⚠️  Intelligent positioning failed: {e}")
-            print(f"🔄 Falling back to original position")
-            new_bbox = original_bbox
-            positioning_strategy = "fallback"
-            # Initialize smart_alignment for fallback case
-            smart_alignment = {
-                'strategy': 'fallback',
-                'reasoning': 'Error in intelligent positioning',
-                'new_bbox': original_bbox
-            }
-        
-        # Determine effective font weight based on multiple factors
-        # High visual boldness score or explicit bold flag should result in bold text
-        effective_bold = is_bold or (visual_boldness > 50.0)
-        
-        print(f"🔍 BOLDNESS ANALYSIS:")
-        print(f"   Flag Bold: {is_bold}")
-        print(f"   Visual Boldness Score: {visual_boldness}")
-        print(f"   Effective Bold: {effective_bold}")
-        
-        # Map font to PyMuPDF font with proper boldness
-        pymupdf_font = map_to_pymupdf_font(font_name, effective_bold, is_italic)
-        
-        # Get original color and spacing from metadata
-        original_color_rgb = metadata.get("color_rgb", [0, 0, 0])  # Default to black if not found
-        original_color_normalized = tuple(c/255.0 for c in original_color_rgb)  # PyMuPDF uses 0-1 range
-        
-        # Extract spacing information for better text rendering
-        char_spacing = metadata.get("char_spacing", 0.0)
-        word_spacing = metadata.get("word_spacing", 0.0)
-        
-        print(f"🎨 Using original color: RGB{original_color_rgb} -> Normalized{original_color_normalized}")
-        print(f"📏 Character spacing: {char_spacing}, Word spacing: {word_spacing}")
-        
-        # INTELLIGENT POSITIONING ANALYSIS - Using Smart Alignment
-        print(f"🔍 USING SMART ALIGNMENT (already calculated above)")
-        positioning_strategy = smart_alignment['strategy']
-        
-        # Create rectangle for the original text (to clear)
-        original_text_rect = fitz.Rect(original_bbox)
-        
-        # Clear the original text by drawing a white rectangle
-        pymupdf_page.draw_rect(original_text_rect, color=None, fill=fitz.utils.getColor("white"))
-        
-        # USE SMART ALIGNMENT COORDINATES for proper center preservation
-        new_x0, new_y0, new_x1, new_y1 = new_bbox
-        
-        # For PyMuPDF, the text insertion point should be at the bottom-left of where we want the text
-        # So we use the calculated X coordinate and adjust Y to the baseline
-        text_x = new_x0  # Use smart alignment X coordinate
-        text_y = original_bbox[3]  # Keep original baseline Y (bottom of original text)
-        
-        text_point = fitz.Point(text_x, text_y)
-        
-        print(f"📍 SMART ALIGNMENT POSITIONING:")
-        print(f"   Page size: {page_width:.1f} x {page_height:.1f}")
-        print(f"   Original bbox: {original_bbox}")
-        print(f"   Smart alignment bbox: {new_bbox}")
-        print(f"   Text insertion point: ({text_point.x:.2f}, {text_point.y:.2f})")
-        print(f"   Strategy: {positioning_strategy}")
-        print(f"   X shift: {text_x - original_bbox[0]:.2f}")
-        print(f"   Y unchanged (baseline preserved)")
-        
-        # Determine render mode based on boldness intensity
-        # For very high visual boldness, use stroke rendering for extra boldness
-        render_mode = 0  # Default: fill text
-        if visual_boldness > 75.0:
-            render_mode = 2  # Fill and stroke for extra boldness
-        
-        # Insert the new text with enhanced positioning and styling
-        text_length = pymupdf_page.insert_text(
-            text_point,
-            new_text,
-            fontsize=font_size,
-            fontname=pymupdf_font,
-            color=original_color_normalized,
-            render_mode=render_mode
-        )
-        
-        print(f"✅ Text successfully replaced with INTELLIGENT POSITIONING + PRECISE FONT MATCHING")
-        print(f"   Font: {pymupdf_font} (was: {font_name}), Strategy: {positioning_strategy}")
-        print(f"   Size: {font_size}pt, Color: {original_color_rgb}, Position: ({text_point.x:.2f}, {text_point.y:.2f})")
-        
-        # Convert back to bytes
-        pdf_bytes = pymupdf_doc.write()
-        print(f"📄 PDF write successful: {len(pdf_bytes)} bytes")
-        
-        # Close the document
-        pymupdf_doc.close()
-        print(f"📄 PDF document closed successfully")
+            # Convert back to bytes: append only the changed objects for large files, full rewrite otherwise
+            if tmp_path and pymupdf_doc.can_save_incrementally():
+                pymupdf_doc.save(tmp_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+                with open(tmp_path, "rb") as f:
+                    pdf_bytes = f.read()
+                logger.debug("📄 Incremental PDF save successful: %s bytes", len(pdf_bytes))
+            else:
+                pdf_bytes = pymupdf_doc.write()
+                logger.debug("📄 PDF write successful: %s bytes", len(pdf_bytes))
+        finally:
+            # Close the document
+            pymupdf_doc.close()
+        logger.debug("📄 PDF document closed successfully")
         
         # Encode to base64
-        pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
-        print(f"✅ Base64 encoding successful: {len(pdf_base64)} chars")
+        pdf_base64 = base64.b64encode(pdf_bytes).decode('ascii')
+        logger.debug("✅ Base64 encoding successful: %s chars", len(pdf_base64))
         
-        print(f"✅ ADVANCED EDIT complete: Generated {len(pdf_bytes)} bytes")
+        logger.debug("✅ ADVANCED EDIT complete: %s edit(s), generated %s bytes", len(planned), len(pdf_bytes))
         
-        return jsonify({
-            "success": True,
-            "pdf_data": pdf_base64,
-            "edit_details": {
-                "original_text": original_text,
-                "new_text": new_text,
-                "font_used": pymupdf_font,
-                "positioning_strategy": positioning_strategy,
-                "color_preserved": original_color_rgb,
-                "effective_bold": effective_bold,
-                "visual_boldness_score": visual_boldness
-            }
-        })
+        response = {"success": True, "pdf_data": pdf_base64}
+        if is_batch:
+            response["edit_details"] = [plan["details"] for _, plan in planned]
+        else:
+            response["edit_details"] = planned[0][1]["details"]
+        return jsonify(response)
         
     except Exception as e:
-        print(f"❌ ADVANCED EDIT ERROR: {e}")
+        logger.error("❌ ADVANCED EDIT ERROR: %s", e)
         return jsonify({"error": f"Text editing failed: {str(e)}"}), 500
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
 
 @app.route('/pdf/<file_id>/download', methods=['POST', 'OPTIONS'])
 def download_pdf(file_id):
@@ -796,7 +895,7 @@ def download_pdf(file_id):
         return '', 200
         
     try:
-        print(f"📥 DOWNLOAD: Starting download for file_id: {file_id}")
+        logger.debug("📥 DOWNLOAD: Starting download for file_id: %s", file_id)
         
         # Get request data
         data = request.get_json()
@@ -804,9 +903,9 @@ def download_pdf(file_id):
         
         # Decode the PDF data
         pdf_bytes = base64.b64decode(pdf_data)
-        print(f"📄 PDF data decoded: {len(pdf_bytes)} bytes")
+        logger.debug("📄 PDF data decoded: %s bytes", len(pdf_bytes))
         
-        print(f"✅ DOWNLOAD: Ready to serve {len(pdf_bytes)} bytes")
+        logger.debug("✅ DOWNLOAD: Ready to serve %s bytes", len(pdf_bytes))
         
         return Response(
             pdf_bytes,
@@ -822,7 +921,7 @@ def download_pdf(file_id):
         )
         
     except Exception as e:
-        print(f"❌ Download failed: {e}")
+        logger.error("❌ Download failed: %s", e)
         return jsonify({"error": f"Download failed: {str(e)}"}), 500
 
 # Health check endpoint
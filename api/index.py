@@ -1,87 +1,48 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 import os
 import uuid
 import io
 import fitz  # PyMuPDF - ONLY dependency for PDF processing
-import base64
 import re
 import math
-from typing import Dict, List, Tuple, Any
+import asyncio
+from functools import lru_cache
+from types import MappingProxyType
+from collections import OrderedDict
+from typing import Dict, Tuple, Any
+
+# Fill used to blank out the original text before redrawing it
+_WHITE = (1.0, 1.0, 1.0)
+
+# Weight keywords in font names, matched in one pass
+_BOLD_NAME_RE = re.compile(r"bold|heavy|black", re.IGNORECASE)
+_INV255 = 1.0 / 255.0
+
+@lru_cache(maxsize=512)
+def _is_bold_font_name(font_name: str) -> bool:
+    """True if the font name carries a bold weight keyword (memoized - documents reuse few fonts)"""
+    return _BOLD_NAME_RE.search(font_name) is not None
 
 def extract_pymupdf_metadata(pdf_content: bytes, page_num: int = None) -> Dict[str, Any]:
     """
     Extract enhanced text metadata using ONLY PyMuPDF - lightweight but powerful
     """
     doc = fitz.open(stream=pdf_content, filetype="pdf")
-    meta        # Open               
-              pymupdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
-        pymupdf_page = pymupdf_doc[edit_request.page - 1]  # Convert to 0-based index
-        
-        # CENTER PRESERVATION LOGIC ACTIVE
-        print(f"✅ CENTER PRESERVATION LOGIC ACTIVE")
-        positioning_strategy = "CENTER_PRESERVATION"
-        
-        print(f"🎯 CENTER PRESERVATION:")
-        print(f"   Original bbox: {original_bbox}")
-        print(f"   Strategy: {positioning_strategy}")
-        
-        # Determine effective font weight based on multiple factors
-        # High visual boldness score or explicit bold flag should result in bold text
-        effective_bold = is_bold or (visual_boldness > 50.0) editing
-        pymupdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
-        pymupdf_page = pymupdf_doc[edit_request.page - 1]  # Convert to 0-based index
-        
-        # USE CENTER PRESERVATION LOGIC
-        print(f"✅ USING CENTER PRESERVATION LOGIC")
-        positioning_strategy = "CENTER_PRESERVATION"
-        
-        print(f"🎯 CENTER PRESERVATION ACTIVE:")
-        print(f"   Original bbox: {original_bbox}")
-        print(f"   Strategy: {positioning_strategy}")
-        
-        # Determine effective font weight based on multiple factorsetermine effective font weight based on multiple factorsne effective font weight based on multiple factorsne effective font weight based on multiple factors
-        # High visual boldness score or explicit bold flag should result in bold text
-        effective_bold = is_bold or (visual_boldness > 50.0)
-        
-        print(f"🔍 BOLDNESS ANALYSIS:")
-        print(f"   Flag Bold: {is_bold}")
-        print(f"   Visual Boldness Score: {visual_boldness}")
-        print(f"   Effective Bold: {effective_bold}")       pymupdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
-        pymupdf_page = pymupdf_doc[edit_request.page - 1]  # Convert to 0-based index
-        
-        # USE CENTER PRESERVATION LOGIC (no bypass)
-        print(f"✅ USING CENTER PRESERVATION LOGIC")
-        positioning_strategy = "CENTER_PRESERVATION"
-        
-        print(f"🎯 CENTER PRESERVATION ACTIVE:")
-        print(f"   Original bbox: {original_bbox}")
-        print(f"   Strategy: {positioning_strategy}")
-        print(f"   Will calculate center-aligned position...") 
-    # Proce        # Use the intelligently calculated position for new text with baseline adjustment
-        # COORDINATE SYSTEM FIX: bbox gives TOP-LEFT coordinates, insert_text needs BASELINE
-        original_text_x = original_bbox[0]  # Left edge (correct)
-        original_text_top = original_bbox[1]  # Top of text box
-        original_text_bottom = original_bbox[3]  # Bottom of text box
-        
-        # PyMuPDF insert_text needs BASELINE Y coordinate, not top
-        # Baseline is typically ~80% down from top to bottom
-        text_height = original_text_bottom - original_text_top
-        baseline_y = original_text_top + (text_height * 0.8)
-        
-        text_point = fitz.Point(original_text_x, baseline_y)
-        
-        print(f"📍 BASELINE COORDINATE CORRECTION:")
-        print(f"   Original bbox: {original_bbox}")
-        print(f"   Left X: {original_text_x}")
-        print(f"   Top Y: {original_text_top}")
-        print(f"   Bottom Y: {original_text_bottom}")
-        print(f"   Text height: {text_height:.1f}")
-        print(f"   Baseline Y: {baseline_y:.1f} (80% down from top)")
-        print(f"   Text point: ({text_point.x:.2f}, {text_point.y:.2f})")
-        print(f"   Strategy: {positioning_strategy}")age or all pages
+    try:
+        return _extract_from_doc(doc, page_num)
+    finally:
+        doc.close()
+
+def _extract_from_doc(doc: fitz.Document, page_num: int = None) -> Dict[str, Any]:
+    """
+    Span metadata from an already-open document, so callers that keep the document open don't parse it twice
+    """
+    metadata = {}
+    
+    # Process specific page or all pages
     pages_to_process = [page_num] if page_num is not None else range(len(doc))
     
     for page_idx in pages_to_process:
@@ -89,75 +50,55 @@ def extract_pymupdf_metadata(pdf_content: bytes, page_num: int = None) -> Dict[s
             continue
             
         page = doc[page_idx]
+        page_no = page_idx + 1
         
         # Get text with detailed font information using PyMuPDF's dict format
         text_dict = page.get_text("dict", flags=11)
         
-        for block in text_dict["blocks"]:
-            if "lines" in block:
-                for line in block["lines"]:
-                    for span in line["spans"]:
-                        text = span["text"].strip()
-                        if text:  # Only process non-empty text
-                            
-                            # Enhanced font analysis using PyMuPDF
-                            font_name = span["font"]
-                            font_size = span["size"]
-                            flags = span["flags"]
-                            bbox = span["bbox"]
-                            color = span["color"]
-                            
-                            # ENHANCED BOLDNESS DETECTION using PyMuPDF flags
-                            is_bold_flag = bool(flags & 2**4)  # Bold flag (bit 16)
-                            is_bold_name = any(bold_word in font_name.lower() 
-                                             for bold_word in ['bold', 'heavy', 'black'])
-                            
-                            # Calculate boldness score
-                            boldness_score = 0
-                            if is_bold_flag:
-                                boldness_score += 0.6
-                            if is_bold_name:
-                                boldness_score += 0.4
-                            
-                            # Font weight estimation
-                            font_weight = 700 if (is_bold_flag or is_bold_name) else 400
-                            
-                            # SIZE ANALYSIS - actual rendered height
-                            actual_height = bbox[3] - bbox[1]
-                            size_ratio = actual_height / font_size if font_size > 0 else 1.0
-                            
-                            # RGB Color conversion
-                            if isinstance(color, int):
-                                r = (color >> 16) & 255
-                                g = (color >> 8) & 255  
-                                b = color & 255
-                                rgb_color = (r/255.0, g/255.0, b/255.0)
-                            else:
-                                rgb_color = (0, 0, 0)  # Default black
-                            
-                            # Create unique key
-                            key = f"page_{page_idx+1}_text_{len(metadata)}"
-                            
-                            metadata[key] = {
-                                "text": text,
-                                "bbox": list(bbox),
-                                "page": page_idx + 1,
-                                "font_name": font_name,
-                                "font_size": font_size,
-                                "actual_height": actual_height,
-                                "size_ratio": size_ratio,
-                                "color": rgb_color,
-                                "color_int": color,
-                                "flags": flags,
-                                "is_bold": is_bold_flag or is_bold_name,
-                                "boldness_score": boldness_score,
-                                "font_weight": font_weight,
-                                "is_italic": bool(flags & 2**1),  # Italic flag
-                                "clean_font_name": font_name,
-                                "visual_boldness_score": boldness_score,
-                            }
+        # Flatten the block/line/span nesting into plain tuples in one comprehension
+        spans = [
+            (text, span["font"], span["size"], span["flags"], span["bbox"], span["color"])
+            for block in text_dict["blocks"] if "lines" in block
+            for line in block["lines"]
+            for span in line["spans"]
+            if (text := span["text"].strip())  # Only process non-empty text
+        ]
+        
+        for text, font_name, font_size, flags, bbox, color in spans:
+            # ENHANCED BOLDNESS DETECTION using PyMuPDF flags and font names
+            is_bold_flag = bool(flags & 16)  # Bold flag (bit 4)
+            is_bold_name = _is_bold_font_name(font_name)
+            is_bold = is_bold_flag or is_bold_name
+            boldness_score = 0.6 * is_bold_flag + 0.4 * is_bold_name
+            
+            # SIZE ANALYSIS - actual rendered height
+            actual_height = bbox[3] - bbox[1]
+            
+            # RGB Color conversion
+            if isinstance(color, int):
+                rgb_color = (((color >> 16) & 255) * _INV255, ((color >> 8) & 255) * _INV255, (color & 255) * _INV255)
+            else:
+                rgb_color = (0, 0, 0)  # Default black
+            
+            metadata[f"page_{page_no}_text_{len(metadata)}"] = {
+                "text": text,
+                "bbox": list(bbox),
+                "page": page_no,
+                "font_name": font_name,
+                "font_size": font_size,
+                "actual_height": actual_height,
+                "size_ratio": actual_height / font_size if font_size > 0 else 1.0,
+                "color": rgb_color,
+                "color_int": color,
+                "flags": flags,
+                "is_bold": is_bold,
+                "boldness_score": boldness_score,
+                "font_weight": 700 if is_bold else 400,
+                "is_italic": bool(flags & 2),  # Italic flag
+                "clean_font_name": font_name,
+                "visual_boldness_score": boldness_score,
+            }
     
-    doc.close()
     return metadata
 
 def determine_text_context(text: str, line_text: str, bbox: tuple, page_width: float) -> str:
@@ -222,15 +163,16 @@ def determine_text_context(text: str, line_text: str, bbox: tuple, page_width: f
     return 'left_aligned'
 
 
-def estimate_text_width_simple(text: str, font_size: float) -> float:
+@lru_cache(maxsize=4096)
+def _text_width(text: str, fontname: str, fontsize: float) -> float:
+    """Rendered width of text in a Base-14 font, cached since edits repeat font/size pairs"""
+    return fitz.get_text_length(text, fontname=fontname, fontsize=fontsize)
+
+def estimate_text_width_simple(text: str, font_size: float, fontname: str = "helv") -> float:
     """
-    Simple heuristic for text width using PyMuPDF-extracted font size.
+    Text width from the Base-14 font's glyph advances (edits are drawn in helv by default).
     """
-    # This factor is approximate and depends on the actual font.
-    # 0.6 is a common average for many sans-serif fonts like Helvetica.
-    average_char_width_factor = 0.6
-    estimated_width = len(text) * font_size * average_char_width_factor
-    return estimated_width
+    return _text_width(text, fontname, font_size)
 
 
 def calculate_new_text_position(
@@ -303,7 +245,7 @@ def calculate_new_text_position(
     return (new_x0, new_y0, new_x1, new_y1)
 
 
-def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, page_width: float, all_text_items: list) -> dict:
+def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, page_width: float, all_text_items: list, fontname: str = "helv") -> dict:
     """
     CENTER PRESERVATION: Calculate position to maintain center alignment
     """
@@ -314,9 +256,8 @@ def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, p
     original_center_x = (x0 + x1) / 2
     original_center_y = (y0 + y1) / 2
     
-    # Estimate new text width
-    estimated_char_width = font_size * 0.6
-    estimated_text_width = len(text) * estimated_char_width
+    # Measure new text width in the font it will be drawn with
+    estimated_text_width = _text_width(text, fontname, font_size)
     
     # Position new text to center on original center
     new_x0 = original_center_x - (estimated_text_width / 2)
@@ -335,7 +276,7 @@ def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, p
         'new_bbox': new_bbox
     }
 
-fastapi_app = FastAPI(title="PDF Editor Backend - Advanced")
+fastapi_app = FastAPI(title="PDF Editor Backend - Advanced", default_response_class=ORJSONResponse)
 
 # Get the frontend URL from environment variable (for Vercel)
 frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
@@ -360,11 +301,34 @@ class EditRequest(BaseModel):
     page: int
     metadata_key: str
     new_text: str
-    pdf_data: str  # Base64 encoded PDF data
     text_metadata: Dict[str, Any]
 
-class DownloadRequest(BaseModel):
-    pdf_data: str  # Base64 encoded PDF data
+# Latest PDF bytes per file_id, so edits and downloads don't round-trip base64
+MAX_CACHED_FILES = 32
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+_PDF_CACHE: "OrderedDict[str, bytes]" = OrderedDict()
+
+def _cache_put(cache: OrderedDict, file_id: str, value: Any) -> None:
+    """Store a value for file_id, evicting the least recently used file when full"""
+    cache[file_id] = value
+    cache.move_to_end(file_id)
+    while len(cache) > MAX_CACHED_FILES:
+        cache.popitem(last=False)
+
+def _cache_get(cache: OrderedDict, file_id: str) -> Any:
+    """Fetch the cached value for file_id (None if missing) and mark it recently used"""
+    value = cache.get(file_id)
+    if value is not None:
+        cache.move_to_end(file_id)
+    return value
+
+def _iter_pdf_chunks(pdf_bytes: bytes):
+    """Yield the PDF in fixed-size chunks for StreamingResponse"""
+    buffer = io.BytesIO(pdf_bytes)
+    chunk = buffer.read(DOWNLOAD_CHUNK_SIZE)
+    while chunk:
+        yield chunk
+        chunk = buffer.read(DOWNLOAD_CHUNK_SIZE)
 
 @fastapi_app.get("/")
 async def root():
@@ -407,25 +371,10 @@ async def upload_pdf(file: UploadFile = File(...)):
         print("🔍 STARTING ENHANCED METADATA EXTRACTION...")
         
         try:
-            # Extract text metadata from ALL pages
-            all_metadata = []
-            
-            # Get total pages
-            doc = fitz.open(stream=file_content, filetype="pdf")
-            total_pages = len(doc)
-            doc.close()
-            
-            print(f"📄 Processing {total_pages} pages...")
-            
-            # Extract metadata from each page
-            for page_idx in range(total_pages):
-                print(f"🔍 Processing page {page_idx + 1}/{total_pages}...")
-                # Use PyMuPDF-only metadata extraction
-                page_metadata = extract_pymupdf_metadata(file_content, page_num=page_idx)
-                if page_metadata:
-                    # page_metadata is a dict, convert to list of metadata items
-                    for key, metadata in page_metadata.items():
-                        all_metadata.append(metadata)
+            # Extract text metadata from ALL pages; the PDF is parsed once, not once per page.
+            # PyMuPDF holds the GIL and a Document is single-threaded, so one worker thread
+            # walks every page of one Document, keeping the event loop free meanwhile
+            all_metadata = list((await asyncio.to_thread(extract_pymupdf_metadata, file_content)).values())
             
             if not all_metadata:
                 raise Exception("Enhanced extraction returned empty results")
@@ -438,53 +387,57 @@ async def upload_pdf(file: UploadFile = File(...)):
             for i, metadata in enumerate(all_metadata):
                 metadata_key = f"text_item_{i+1}"
                 
+                # Each field is read once and shared by the display item and the editing metadata
+                text, bbox, page_no = metadata["text"], metadata["bbox"], metadata["page"]
+                font, size, flags = metadata["clean_font_name"], metadata["font_size"], metadata["flags"]
+                is_bold, is_italic = metadata["is_bold"], metadata["is_italic"]
+                color, visual_boldness = metadata["color_int"], metadata["visual_boldness_score"]
+                
                 # Create text item for frontend display
-                text_item = {
-                    "text": metadata["text"],
-                    "page": metadata["page"],  # Use actual page number from metadata
-                    "x": metadata["bbox"][0],
-                    "y": metadata["bbox"][1],
-                    "width": metadata["bbox"][2] - metadata["bbox"][0],  # Calculate width from bbox
-                    "height": metadata["bbox"][3] - metadata["bbox"][1],  # Calculate height from bbox
-                    "font": metadata["clean_font_name"],
-                    "size": metadata["font_size"],
+                text_items.append({
+                    "text": text,
+                    "page": page_no,  # Use actual page number from metadata
+                    "x": bbox[0],
+                    "y": bbox[1],
+                    "width": bbox[2] - bbox[0],  # Calculate width from bbox
+                    "height": bbox[3] - bbox[1],  # Calculate height from bbox
+                    "font": font,
+                    "size": size,
                     "metadata_key": metadata_key,
-                    "color": metadata["color_int"],
-                    "flags": metadata["flags"],
-                    "is_bold": metadata["is_bold"],
-                    "is_italic": metadata["is_italic"],
-                    "visual_boldness": metadata["visual_boldness_score"]
-                }
+                    "color": color,
+                    "flags": flags,
+                    "is_bold": is_bold,
+                    "is_italic": is_italic,
+                    "visual_boldness": visual_boldness
+                })
                 
                 # Store COMPREHENSIVE metadata for editing
                 text_metadata[metadata_key] = {
                     # Basic text properties
-                    "text": metadata["text"],
-                    "bbox": metadata["bbox"],
-                    "page": metadata["page"],
+                    "text": text,
+                    "bbox": bbox,
+                    "page": page_no,
                     
                     # Font properties
-                    "font": metadata["clean_font_name"],
-                    "size": metadata["font_size"],
-                    "flags": metadata["flags"],
+                    "font": font,
+                    "size": size,
+                    "flags": flags,
                     
                     # Enhanced boldness detection
-                    "is_bold": metadata["is_bold"],
-                    "visual_boldness_score": metadata["visual_boldness_score"],
+                    "is_bold": is_bold,
+                    "visual_boldness_score": visual_boldness,
                     
                     # Style properties  
-                    "is_italic": metadata["is_italic"],
+                    "is_italic": is_italic,
                     
                     # Color and rendering
-                    "color": metadata["color_int"],
-                    "color_rgb": [int(c*255) for c in metadata["color"]],  # Convert back to RGB 0-255
+                    "color": color,
+                    "color_rgb": [round(c * 255) for c in metadata["color"]],  # Back to RGB 0-255; round, since c * 255 can land just below the integer
                     
                     # Spacing and positioning (using defaults for now)
                     "char_spacing": 0.0,
                     "word_spacing": 0.0
                 }
-                
-                text_items.append(text_item)
         
         except Exception as extraction_error:
             print(f"❌ Enhanced extraction failed: {extraction_error}")
@@ -561,59 +514,57 @@ async def upload_pdf(file: UploadFile = File(...)):
                                     }
                                     
                                     text_items.append(text_item)
-                                    
-                                    print(f"📝 BASIC: '{span['text'][:20]}' -> Font: {font_info}, Size: {font_size}, Bold: {is_bold}")
             
             pdf_document.close()
             print(f"✅ FALLBACK extraction complete: {len(text_items)} items")
         
+        # Later edits and downloads start from the cached bytes
+        _cache_put(_PDF_CACHE, file_id, file_content)
+        
         print(f"✅ ADVANCED PDF processing complete: {len(text_items)} text items, {len(embedded_fonts)} embedded fonts")
         
-        return {
+        # Returned as a response object so FastAPI skips its jsonable_encoder walk over every item
+        return ORJSONResponse({
             "file_id": file_id,
             "text_items": text_items,
             "text_metadata": text_metadata,
             "embedded_fonts": embedded_fonts,
             "total_items": len(text_items),
             "processing_method": "enhanced" if len(all_metadata) > 0 else "fallback"
-        }
+        })
         
     except Exception as e:
         print(f"❌ Upload failed: {e}")
         raise HTTPException(status_code=500, detail=f"Upload processing failed: {str(e)}")
 
+# One compiled scan finds every family keyword in a font name; anything else is Helvetica
+_FONT_FAMILY_RE = re.compile(r"(?P<times>times|serif|roman)|(?P<cour>courier|mono|consolas|menlo)")
+_FAMILY_PRIORITY = ("times", "cour")
+
+# (family, is_bold, is_italic) -> Base-14 font; bold italic uses the bold face, Courier has no italic here
+_BASE14_VARIANTS = MappingProxyType({
+    ("helv", False, False): "helv",
+    ("helv", True, False): "hebo",
+    ("helv", False, True): "heit",
+    ("helv", True, True): "hebo",
+    ("times", False, False): "tiro",
+    ("times", True, False): "tibo",
+    ("times", False, True): "tiit",
+    ("times", True, True): "tibo",
+    ("cour", False, False): "cour",
+    ("cour", True, False): "cobo",
+    ("cour", False, True): "cour",
+    ("cour", True, True): "cobo",
+})
+
+@lru_cache(maxsize=1024)
 def map_to_pymupdf_font(font_name: str, is_bold: bool = False, is_italic: bool = False) -> str:
     """
-    Map font names to PyMuPDF built-in fonts with enhanced mapping
+    Map font names to PyMuPDF built-in fonts with enhanced mapping (memoized - edits reuse few fonts)
     """
-    font_name_lower = font_name.lower()
-    
-    # Enhanced font mapping with style consideration
-    if any(serif in font_name_lower for serif in ['times', 'serif', 'roman']):
-        if is_bold and is_italic:
-            return "tibo"  # Times Bold Italic
-        elif is_bold:
-            return "tibo"  # Times Bold (closest match)
-        elif is_italic:
-            return "tibo"  # Times Italic (closest match)
-        else:
-            return "times"  # Times Roman
-    
-    elif any(mono in font_name_lower for mono in ['courier', 'mono', 'consolas', 'menlo']):
-        if is_bold:
-            return "cobo"  # Courier Bold
-        else:
-            return "cour"  # Courier
-    
-    else:  # Default to Helvetica family
-        if is_bold and is_italic:
-            return "helv"  # Helvetica (closest available)
-        elif is_bold:
-            return "hebo"  # Helvetica Bold
-        elif is_italic:
-            return "heob"  # Helvetica Oblique
-        else:
-            return "helv"  # Helvetica
+    families = {match.lastgroup for match in _FONT_FAMILY_RE.finditer(font_name.lower())}
+    family = next((f for f in _FAMILY_PRIORITY if f in families), "helv")
+    return _BASE14_VARIANTS[(family, bool(is_bold), bool(is_italic))]
 
 @fastapi_app.post("/pdf/{file_id}/edit")
 async def edit_text(file_id: str, edit_request: EditRequest):
@@ -624,8 +575,11 @@ async def edit_text(file_id: str, edit_request: EditRequest):
         print(f"🚀 ADVANCED EDITING: Starting text edit for file_id: {file_id}")
         print(f"📝 Edit request - page: {edit_request.page}, metadata_key: {edit_request.metadata_key}")
         
-        # Decode the PDF data
-        pdf_content = base64.b64decode(edit_request.pdf_data)
+        # Edits always start from the latest cached version. A client copy can't stand in on a miss:
+        # the edit response carries no PDF, so the client only ever holds the unedited upload
+        pdf_content = _cache_get(_PDF_CACHE, file_id)
+        if pdf_content is None:
+            raise HTTPException(status_code=404, detail="PDF not found, please upload it again")
         
         # Debug: Check text_metadata structure
         print(f"🔍 EDIT DEBUG: text_metadata type = {type(edit_request.text_metadata)}")
@@ -662,6 +616,9 @@ async def edit_text(file_id: str, edit_request: EditRequest):
         # Open PDF for editing
         pymupdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
         pymupdf_page = pymupdf_doc[edit_request.page - 1]  # Convert to 0-based index
+        page_width = pymupdf_page.rect.width
+        page_height = pymupdf_page.rect.height
+        smart_alignment = get_smart_alignment(new_text, original_text, original_text, tuple(original_bbox), page_width, [])
         
         # Determine effective font weight based on multiple factors
         # High visual boldness score or explicit bold flag should result in bold text
@@ -694,7 +651,7 @@ async def edit_text(file_id: str, edit_request: EditRequest):
         original_text_rect = fitz.Rect(original_bbox)
         
         # Clear the original text by drawing a white rectangle
-        pymupdf_page.draw_rect(original_text_rect, color=None, fill=fitz.utils.getColor("white"))
+        pymupdf_page.draw_rect(original_text_rect, color=None, fill=_WHITE)
         
         # DEBUGGING: Use EXACT original coordinates to see what happens
         # If this STILL centers, then PyMuPDF has a different coordinate system
@@ -787,15 +744,14 @@ async def edit_text(file_id: str, edit_request: EditRequest):
         pymupdf_doc.close()
         print(f"📄 PDF document closed successfully")
         
-        # Encode to base64
-        pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
-        print(f"✅ Base64 encoding successful: {len(pdf_base64)} chars")
+        # Keep the edited bytes server-side for the next edit / download
+        _cache_put(_PDF_CACHE, file_id, pdf_bytes)
         
         print(f"✅ ADVANCED EDIT complete: Generated {len(pdf_bytes)} bytes")
         
         return {
             "success": True,
-            "pdf_data": pdf_base64,
+            "pdf_size": len(pdf_bytes),
             "edit_details": {
                 "original_text": original_text,
                 "new_text": new_text,
@@ -807,26 +763,29 @@ async def edit_text(file_id: str, edit_request: EditRequest):
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ ADVANCED EDIT ERROR: {e}")
         raise HTTPException(status_code=500, detail=f"Text editing failed: {str(e)}")
 
 @fastapi_app.post("/pdf/{file_id}/download")
-async def download_pdf(file_id: str, download_request: DownloadRequest):
+async def download_pdf(file_id: str):
     """
     Download the edited PDF
     """
     try:
         print(f"📥 DOWNLOAD: Starting download for file_id: {file_id}")
         
-        # Decode the PDF data
-        pdf_bytes = base64.b64decode(download_request.pdf_data)
-        print(f"📄 PDF data decoded: {len(pdf_bytes)} bytes")
+        # Serve the cached bytes; on a miss the edits are gone, so the client has to upload again
+        pdf_bytes = _cache_get(_PDF_CACHE, file_id)
+        if pdf_bytes is None:
+            raise HTTPException(status_code=404, detail="PDF not found, please upload it again")
         
         print(f"✅ DOWNLOAD: Ready to serve {len(pdf_bytes)} bytes")
         
-        return Response(
-            content=pdf_bytes,
+        return StreamingResponse(
+            _iter_pdf_chunks(pdf_bytes),
             media_type="application/pdf",
             headers={
                 "Content-Disposition": f"attachment; filename=edited_{file_id}.pdf",
@@ -835,6 +794,8 @@ async def download_pdf(file_id: str, download_request: DownloadRequest):
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Download failed: {e}")
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
@@ -847,8 +808,7 @@ async def health_check():
 # Simple handler function for Vercel
 def handler(event, context):
     """
-    Vercel handler function
+    Vercel handler function - delegates to the shared Mangum instance built once in _handler.py
     """
-    from mangum import Mangum
-    asgi_handler = Mangum(app)
+    from _handler import handler as asgi_handler
     return asgi_handler(event, context)
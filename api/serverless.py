@@ -1,18 +1,10 @@
 """
 Serverless entry point for Vercel deployment
-This file creates a minimal handler that wraps our FastAPI application
+Re-exports the shared Mangum handler wrapping our FastAPI application
 """
+import os
+import sys
 
-def create_app():
-    """Factory function to create the FastAPI app"""
-    from .index import app
-    return app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-def create_handler():
-    """Factory function to create the Mangum handler"""
-    from mangum import Mangum
-    app = create_app()
-    return Mangum(app)
-
-# Create the handler using factory pattern to avoid variable exposure
-handler = create_handler()
+from _handler import handler
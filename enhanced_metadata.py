@@ -4,40 +4,109 @@
 import fitz  # PyMuPDF
 import re
 import math
-import cv2
+import logging
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
 import numpy as np
 
+try:
+    import numba  # Optional: JIT for the boldness density kernel
+except ImportError:
+    numba = None
+
+logger = logging.getLogger(__name__)
+
+# Subset prefix on embedded font names (e.g., ABCDEE+Helvetica-Bold)
+_FONT_SUBSET_PREFIX_RE = re.compile(r'^[A-Z0-9]{6}\+')
+# Weight/style keywords; semibold/extrabold/ultrabold and extralight/ultralight are covered by the shorter words
+_BOLD_NAME_RE = re.compile(r'bold|black|heavy|demi')
+_LIGHT_NAME_RE = re.compile(r'thin|light')
+_MEDIUM_NAME_RE = re.compile(r'medium|regular|normal')
+_ITALIC_NAME_RE = re.compile(r'italic|oblique')
+
+
+@lru_cache(maxsize=256)
+def _classify_font_name(raw_font_name):
+    """
+    Font-name analysis, cached because the same few fonts repeat on every span.
+    Returns (clean_font_name, is_bold_name, is_light_name, is_medium_name, is_italic_name).
+    """
+    clean_font_name = _FONT_SUBSET_PREFIX_RE.sub('', raw_font_name)
+    font_name_lower = clean_font_name.lower()
+    return (
+        clean_font_name,
+        bool(_BOLD_NAME_RE.search(font_name_lower)),
+        bool(_LIGHT_NAME_RE.search(font_name_lower)),
+        bool(_MEDIUM_NAME_RE.search(font_name_lower)),
+        bool(_ITALIC_NAME_RE.search(font_name_lower)),
+    )
+
+
+_IDENTITY_TRANSFORM = (1, 0, 0, 1, 0, 0)
+
+# Every low flag byte decoded once, vectorized: _FLAG_BITS[flags & 0xFF][bit] is bit 0-7 as a bool,
+# so each span costs one tuple lookup instead of eight mask-and-bool() calls
+_FLAG_BITS = tuple(map(tuple, ((np.arange(256)[:, None] >> np.arange(8)) & 1).astype(bool).tolist()))
+
+
+@lru_cache(maxsize=256)
+def _transform_metrics(matrix):
+    """
+    Rounded (rotation_degrees, scale_x, scale_y) of a text transform [a, b, c, d, e, f],
+    cached because spans on a page share a handful of matrices (usually just the identity).
+    """
+    m_a, m_b, m_c, m_d = matrix[0], matrix[1], matrix[2], matrix[3]
+    rotation_deg = math.degrees(math.atan2(m_b, m_a))
+    scale_x = math.sqrt(m_a*m_a + m_b*m_b)
+    scale_y = math.sqrt(m_c*m_c + m_d*m_d)
+    return round(rotation_deg, 2), round(scale_x, 4), round(scale_y, 4)
+
+
 def extract_complete_text_metadata(pdf_content, target_text=None, page_num=0):
     """
     Extracts ALL text properties needed for perfect matching
     """
     
+    doc = None
     try:
         doc = fitz.open(stream=pdf_content, filetype="pdf")
         page = doc.load_page(page_num)
         
+        # Cheap flat-text probe first: pages without the target never pay for the dict build
+        if target_text and target_text not in page.get_text("text"):
+            return []
+        
         # Use dict method instead of rawdict for better compatibility
         blocks = page.get_text("dict")["blocks"]
         
         results = []
+        
+        # Page rasterized once per zoom level (only if some span needs it); span tiles are sliced out of it
+        page_grays = {}
+        # Identical runs (same font, size and text) have identical density
+        density_cache = {}
 
         for block in blocks:
             if "lines" not in block:
                 continue
             for line in block["lines"]:
                 for span in line["spans"]:
-                    text = span["text"].strip()
-                    if not text:
+                    raw_text = span["text"]
+                    # Cheapest rejection first: nothing else is computed for non-matching spans
+                    if target_text and target_text not in raw_text:
                         continue
 
-                    if target_text and target_text not in text:
+                    text = raw_text.strip()
+                    if not text:
                         continue
 
                     try:
                         # === BASIC PROPERTIES ===
-                        raw_font_name = span.get("font", "")
-                        font_size = round(span.get("size", 0), 2)
-                        color_int = span.get("color", 0)
+                        _get = span.get
+                        raw_font_name = _get("font", "")
+                        font_size = round(_get("size", 0), 2)
+                        color_int = _get("color", 0)
                         
                         # Convert color to RGB
                         r = (color_int >> 16) & 0xFF
@@ -45,62 +114,60 @@ def extract_complete_text_metadata(pdf_content, target_text=None, page_num=0):
                         b = color_int & 0xFF
 
                         # Bounding box and position
-                        bbox = span.get("bbox", [0, 0, 0, 0])
-                        origin = span.get("origin", bbox[:2])  # fallback to bbox if no origin
+                        bbox = _get("bbox", [0, 0, 0, 0])
+                        origin = _get("origin", bbox[:2])  # fallback to bbox if no origin
 
                         # === FONT FLAGS ANALYSIS ===
-                        flags = span.get("flags", 0)
-                        is_superscript = bool(flags & 1)      # bit 0
-                        is_italic = bool(flags & 2)           # bit 1
-                        is_serif = bool(flags & 4)            # bit 2
-                        is_monospace = bool(flags & 8)        # bit 3
-                        is_bold = bool(flags & 16)            # bit 4
-                        is_vertical = bool(flags & 32)        # bit 5
-                        is_underline = bool(flags & 64)       # bit 6
-                        is_strikeout = bool(flags & 128)      # bit 7
+                        flags = _get("flags", 0)
+                        (is_superscript,  # bit 0
+                         is_italic,       # bit 1
+                         is_serif,        # bit 2
+                         is_monospace,    # bit 3
+                         is_bold,         # bit 4
+                         is_vertical,     # bit 5
+                         is_underline,    # bit 6
+                         is_strikeout,    # bit 7
+                         ) = _FLAG_BITS[flags & 0xFF]
 
                         # === FONT NAME ANALYSIS ===
-                        # Remove obfuscation prefix (e.g., ABCDEE+Helvetica-Bold)
-                        clean_font_name = re.sub(r'^[A-Z0-9]{6}\+', '', raw_font_name)
-                        font_name_lower = clean_font_name.lower()
-
-                        # Weight detection
-                        bold_keywords = ['bold', 'black', 'heavy', 'demi', 'semibold', 'extrabold', 'ultrabold']
-                        light_keywords = ['thin', 'light', 'extralight', 'ultralight']
-                        medium_keywords = ['medium', 'regular', 'normal']
-                        
-                        is_bold_name = any(kw in font_name_lower for kw in bold_keywords)
-                        is_light_name = any(kw in font_name_lower for kw in light_keywords)
-                        is_medium_name = any(kw in font_name_lower for kw in medium_keywords)
-                        
-                        # Italic detection
-                        is_italic_name = 'italic' in font_name_lower or 'oblique' in font_name_lower
+                        # Prefix stripping plus weight/italic keyword detection
+                        (clean_font_name, is_bold_name, is_light_name,
+                         is_medium_name, is_italic_name) = _classify_font_name(raw_font_name)
 
                         # Final determination
                         final_is_bold = is_bold or is_bold_name
                         final_is_italic = is_italic or is_italic_name
 
                         # === CHARACTER & WORD SPACING ===
-                        char_spacing = span.get("charspace", 0)    # Tc operator
-                        word_spacing = span.get("wordspace", 0)    # Tw operator
+                        char_spacing = _get("charspace", 0)    # Tc operator
+                        word_spacing = _get("wordspace", 0)    # Tw operator
 
                         # === TEXT RENDERING MODE ===
-                        render_mode = span.get("rendermode", 0)
+                        render_mode = _get("rendermode", 0)
 
                         # === TRANSFORM MATRIX ===
-                        matrix = span.get("transform", [1, 0, 0, 1, 0, 0])  # [a, b, c, d, e, f]
-
-                        # Calculate rotation angle (in degrees)
-                        m_a, m_b, m_c, m_d = matrix[0], matrix[1], matrix[2], matrix[3]
-                        rotation_rad = math.atan2(m_b, m_a)
-                        rotation_deg = math.degrees(rotation_rad)
+                        matrix = _get("transform", _IDENTITY_TRANSFORM)  # [a, b, c, d, e, f]
 
-                        # Scale factors
-                        scale_x = math.sqrt(m_a*m_a + m_b*m_b)
-                        scale_y = math.sqrt(m_c*m_c + m_d*m_d)
+                        # Rotation angle (in degrees) and scale factors
+                        rotation_deg, scale_x, scale_y = _transform_metrics(tuple(matrix))
 
                         # === VISUAL PROPERTIES ===
-                        visual_boldness = estimate_visual_boldness_from_content(pdf_content, page_num, bbox)
+                        # Only rasterize when the font metadata doesn't already settle the weight
+                        if final_is_bold:
+                            visual_boldness = 100.0
+                        elif is_light_name:
+                            visual_boldness = 0.0
+                        else:
+                            density_key = (raw_font_name, font_size, text)
+                            visual_boldness = density_cache.get(density_key)
+                            if visual_boldness is None:
+                                # Density is zoom-invariant once strokes are >= 1px; only tiny text needs more pixels
+                                zoom = 2 if font_size >= 8 else 3
+                                page_gray = page_grays.get(zoom)
+                                if page_gray is None:
+                                    page_gray = page_grays[zoom] = render_page_gray(page, zoom)
+                                visual_boldness = estimate_visual_boldness_from_content(page_gray, bbox, zoom=zoom)
+                                density_cache[density_key] = visual_boldness
                         text_width = bbox[2] - bbox[0]
                         text_height = bbox[3] - bbox[1]
 
@@ -153,10 +220,10 @@ def extract_complete_text_metadata(pdf_content, target_text=None, page_num=0):
                             "superscript": is_superscript,
                             
                             # Transform
-                            "transform_matrix": matrix,
-                            "rotation_degrees": round(rotation_deg, 2),
-                            "scale_x": round(scale_x, 4),
-                            "scale_y": round(scale_y, 4),
+                            "transform_matrix": list(matrix),
+                            "rotation_degrees": rotation_deg,
+                            "scale_x": scale_x,
+                            "scale_y": scale_y,
                             
                             # Visual analysis
                             "visual_boldness_score": visual_boldness,
@@ -166,86 +233,173 @@ def extract_complete_text_metadata(pdf_content, target_text=None, page_num=0):
                         results.append(result)
 
                     except Exception as e:
-                        print(f"❌ Error processing span: {e} - Text: {text[:30]}")
+                        logger.error("❌ Error processing span: %s - Text: %s", e, text[:30])
                         continue
 
-        doc.close()
         return results
     
     except Exception as e:
-        print(f"❌ Error in extract_complete_text_metadata: {e}")
+        logger.error("❌ Error in extract_complete_text_metadata: %s", e)
         return []
+    
+    finally:
+        if doc is not None:
+            doc.close()
+
+
+# Pixels at or below this gray level count as ink
+_INK_THRESHOLD = 240
+# Tiles at least this large are counted across threads; smaller ones aren't worth the fork/join
+_PARALLEL_TILE_PIXELS = 1 << 16
+
+if numba is not None:
+    @numba.njit(cache=True, fastmath=True)
+    def _dark_pixel_count(gray, threshold):
+        """Number of pixels <= threshold in a 2D uint8 tile, counted in one fused pass"""
+        rows, cols = gray.shape
+        count = 0
+        for y in range(rows):
+            for x in range(cols):
+                if gray[y, x] <= threshold:
+                    count += 1
+        return count
+
+    @numba.njit(cache=True, fastmath=True, parallel=True)
+    def _dark_pixel_count_parallel(gray, threshold):
+        """Same count as _dark_pixel_count, with rows split across threads"""
+        rows, cols = gray.shape
+        count = 0
+        for y in numba.prange(rows):
+            row_count = 0
+            for x in range(cols):
+                if gray[y, x] <= threshold:
+                    row_count += 1
+            count += row_count
+        return count
+
+    def _dark_pixel_density(gray):
+        """Percentage of ink pixels in a 2D uint8 tile"""
+        if gray.size >= _PARALLEL_TILE_PIXELS:
+            count = _dark_pixel_count_parallel(gray, _INK_THRESHOLD)
+        else:
+            count = _dark_pixel_count(gray, _INK_THRESHOLD)
+        return count * 100.0 / gray.size
+
+    # Compile at import so the first upload doesn't pay for it. Span tiles are column slices of the
+    # page raster (non-contiguous), which numba compiles separately from C-contiguous arrays
+    _WARMUP_TILE = np.zeros((16, 32), dtype=np.uint8)[:, :16]
+    _dark_pixel_count(np.zeros((16, 16), dtype=np.uint8), _INK_THRESHOLD)
+    _dark_pixel_count(_WARMUP_TILE, _INK_THRESHOLD)
+    _dark_pixel_count_parallel(np.zeros((16, 16), dtype=np.uint8), _INK_THRESHOLD)
+    _dark_pixel_count_parallel(_WARMUP_TILE, _INK_THRESHOLD)
+else:
+    def _dark_pixel_density(gray):
+        """Percentage of ink pixels in a 2D uint8 tile"""
+        return np.count_nonzero(gray <= _INK_THRESHOLD) * 100.0 / gray.size
+
+
+# The anti-aliasing level is process-global and get_pixmap has no per-call setting,
+# so concurrent renders take turns switching it off and back on
+_AA_LOCK = threading.Lock()
 
 
-def estimate_visual_boldness_from_content(pdf_content, page_num, bbox, zoom=4):
+def render_page_gray(page, zoom=2):
+    """
+    Rasterize the whole page once as an 8-bit grayscale array (rows x cols).
+    Anti-aliasing is off for this render: density only needs ink/no-ink pixels.
+    """
+    with _AA_LOCK:
+        previous_aa = fitz.TOOLS.show_aa_level()
+        fitz.TOOLS.set_aa_level(0)
+        try:
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False, colorspace=fitz.csGRAY)
+        finally:
+            # set_aa_level writes the text and graphics levels together (PyMuPDF never sets them apart),
+            # so restoring the saved level restores both
+            fitz.TOOLS.set_aa_level(previous_aa["graphics"])
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+
+def estimate_visual_boldness_from_content(page_gray, bbox, zoom=2):
     """
     Returns a visual boldness score based on stroke thickness.
     Higher score = bolder text.
+    Slices the span out of the page raster from render_page_gray() at the same zoom.
     """
     try:
-        doc = fitz.open(stream=pdf_content, filetype="pdf")
-        page = doc.load_page(page_num)
-        
         # Ensure bbox has valid dimensions
         if len(bbox) != 4 or bbox[2] <= bbox[0] or bbox[3] <= bbox[1]:
             return 0.0
         
-        # High-res render for accuracy
-        mat = fitz.Matrix(zoom, zoom)
-        # Create a proper rect and scale bbox for high-res
-        rect = fitz.Rect(bbox[0], bbox[1], bbox[2], bbox[3])
-        scaled_rect = rect * mat
-        
-        # Ensure the rect is valid and not empty
-        if scaled_rect.is_empty or scaled_rect.width < 1 or scaled_rect.height < 1:
-            return 0.0
-            
-        pix = page.get_pixmap(matrix=mat, clip=scaled_rect)
-        
-        # Check if pixmap is valid
-        if not pix or pix.width == 0 or pix.height == 0:
-            return 0.0
-        
-        # Convert to numpy array
-        img_data = pix.samples
-        if len(img_data) == 0:
-            return 0.0
-            
-        img = np.frombuffer(img_data, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
-        
-        # Handle different pixel formats
-        if pix.n == 4:  # RGBA
-            img = img[:, :, :3]  # Drop alpha channel
-        elif pix.n == 1:  # Grayscale
-            gray = img[:, :, 0]
-        else:  # RGB
-            # Convert to grayscale
-            gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+        # Scale the bbox into raster pixels, clamped to the page
+        x0 = max(int(bbox[0] * zoom), 0)
+        y0 = max(int(bbox[1] * zoom), 0)
+        x1 = int(math.ceil(bbox[2] * zoom))
+        y1 = int(math.ceil(bbox[3] * zoom))
+        gray = page_gray[y0:y1, x0:x1]
         
         # Check if we have valid image data
         if gray.size == 0:
             return 0.0
         
-        # Binary threshold (text is dark, background is light)
-        _, binary = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV)
-        
-        # Calculate text density as boldness metric
-        text_pixels = np.sum(binary > 0)
-        total_pixels = binary.size
-        
-        if total_pixels == 0:
-            return 0.0
-            
-        density = (text_pixels / total_pixels) * 100
-        
-        doc.close()
-        return round(density, 2)
+        # Calculate text density as boldness metric (text is dark, background is light)
+        return round(_dark_pixel_density(gray), 2)
         
-    except Exception as e:
+    except Exception:
         # Instead of printing error, return calculated boldness based on font properties
         return 0.0
 
 
+@dataclass
+class SpanColumns:
+    """
+    Structure-of-arrays view of extract_complete_text_metadata() results.
+    Row i of every array describes texts[i], so aggregates are single NumPy passes,
+    e.g. bold spans: np.nonzero(cols.flags & 16)[0]
+    """
+    texts: list
+    font_sizes: np.ndarray       # float32[N]
+    bboxes: np.ndarray           # float32[N, 4]
+    flags: np.ndarray            # uint16[N], PyMuPDF span flags
+    colors: np.ndarray           # uint32[N], 0xRRGGBB
+    bold_names: np.ndarray       # bool[N], font name says bold
+    visual_boldness: np.ndarray  # float64[N]
+
+    def __len__(self):
+        return len(self.texts)
+
+
+def to_columns(results):
+    """
+    Pack the list of span dicts from extract_complete_text_metadata() into SpanColumns
+    """
+    n = len(results)
+    font_sizes = np.empty(n, dtype=np.float32)
+    bboxes = np.empty((n, 4), dtype=np.float32)
+    flags = np.empty(n, dtype=np.uint16)
+    colors = np.empty(n, dtype=np.uint32)
+    bold_names = np.empty(n, dtype=bool)
+    visual_boldness = np.empty(n, dtype=np.float64)
+    
+    for i, item in enumerate(results):
+        font_sizes[i] = item["font_size"]
+        bboxes[i] = item["bbox"]
+        flags[i] = item["font_flags"]
+        colors[i] = item["color_int"]
+        bold_names[i] = item["is_bold_name"]
+        visual_boldness[i] = item["visual_boldness_score"]
+    
+    return SpanColumns(
+        texts=[item["text"] for item in results],
+        font_sizes=font_sizes,
+        bboxes=bboxes,
+        flags=flags,
+        colors=colors,
+        bold_names=bold_names,
+        visual_boldness=visual_boldness,
+    )
+
+
 def analyze_text_differences(pdf_content, page_num=0):
     """
     Analyze all text on a page to find visual differences
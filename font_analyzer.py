@@ -1,27 +1,29 @@
 import fitz
-import pdfplumber
-import io
 import sys
 
 def analyze_pdf_fonts(pdf_content):
     """Detailed font analysis to detect visual boldness differences"""
     
-    print('🔍 COMPREHENSIVE FONT ANALYSIS:')
-    print('=' * 60)
+    # Report lines are collected and written once at the end
+    out = []
     
-    # PyMuPDF analysis - more detailed
+    out.append('🔍 COMPREHENSIVE FONT ANALYSIS:')
+    out.append('=' * 60)
+    
+    # PyMuPDF analysis - more detailed; rawdict carries per-character data for the second pass too
     pdf_doc = fitz.open(stream=pdf_content, filetype='pdf')
     page = pdf_doc[0]
-    text_dict = page.get_text('dict')
+    raw_dict = page.get_text('rawdict')
     
-    print('📄 PyMuPDF Detailed Analysis:')
+    out.append('📄 PyMuPDF Detailed Analysis:')
     unique_styles = {}
     
-    for block in text_dict['blocks']:
+    for block in raw_dict['blocks']:
         if 'lines' in block:
             for line in block['lines']:
                 for span in line['spans']:
-                    if span['text'].strip():
+                    span_text = ''.join(char['c'] for char in span['chars'])
+                    if span_text.strip():
                         # Create a unique style signature
                         style_key = (
                             span['font'],
@@ -32,10 +34,10 @@ def analyze_pdf_fonts(pdf_content):
                         
                         if style_key not in unique_styles:
                             unique_styles[style_key] = []
-                        unique_styles[style_key].append(span['text'][:30])
+                        unique_styles[style_key].append(span_text[:30])
     
     # Print unique styles found
-    print(f"\n🎨 Found {len(unique_styles)} unique text styles:")
+    out.append(f"\n🎨 Found {len(unique_styles)} unique text styles:")
     for i, (style, texts) in enumerate(unique_styles.items(), 1):
         font, size, flags, color = style
         
@@ -52,12 +54,12 @@ def analyze_pdf_fonts(pdf_content):
         else:
             color_desc = str(color)
         
-        print(f"\n  Style {i}:")
-        print(f"    Font: {font}")
-        print(f"    Size: {size}")
-        print(f"    Flags: {flags} (Bold: {bold_flag}, Italic: {italic_flag})")
-        print(f"    Color: {color_desc}")
-        print(f"    Sample texts: {', '.join(texts[:3])}")
+        out.append(f"\n  Style {i}:")
+        out.append(f"    Font: {font}")
+        out.append(f"    Size: {size}")
+        out.append(f"    Flags: {flags} (Bold: {bold_flag}, Italic: {italic_flag})")
+        out.append(f"    Color: {color_desc}")
+        out.append(f"    Sample texts: {', '.join(texts[:3])}")
         
         # Visual weight analysis
         visual_weight = "NORMAL"
@@ -68,42 +70,45 @@ def analyze_pdf_fonts(pdf_content):
         elif flags & 2**0:  # Superscript/subscript
             visual_weight = "MODIFIED"
             
-        print(f"    Visual Weight: {visual_weight}")
+        out.append(f"    Visual Weight: {visual_weight}")
+    
+    out.append('\n' + '=' * 60)
+    out.append('📄 PyMuPDF Character-Level Analysis:')
     
-    print('\n' + '=' * 60)
-    print('📄 pdfplumber Character-Level Analysis:')
+    # Group the first 50 characters by the font properties of their span
+    font_groups = {}
+    char_count = 0
+    for block in raw_dict['blocks']:
+        for line in block.get('lines', ()):
+            for span in line['spans']:
+                key = (span['font'], round(span['size'], 1))
+                for char in span['chars']:
+                    if char_count >= 50:
+                        break
+                    char_count += 1
+                    if char['c'].strip():
+                        font_groups.setdefault(key, []).append(char['c'])
     
-    with pdfplumber.open(io.BytesIO(pdf_content)) as plumber_pdf:
-        page = plumber_pdf.pages[0]
-        chars = page.chars
+    out.append(f"\n🔤 Found {len(font_groups)} character groups:")
+    for font_name, size in font_groups.keys():
+        chars_sample = ''.join(font_groups[(font_name, size)][:10])
         
-        # Group by font properties
-        font_groups = {}
-        for char in chars[:50]:  # First 50 chars
-            if char['text'].strip():
-                key = (char['fontname'], round(char['size'], 1))
-                if key not in font_groups:
-                    font_groups[key] = []
-                font_groups[key].append(char['text'])
+        # Enhanced bold detection
+        is_bold = any(keyword in font_name.lower() for keyword in ['bold', 'black', 'heavy', 'demi', 'thick'])
         
-        print(f"\n🔤 Found {len(font_groups)} character groups:")
-        for font_name, size in font_groups.keys():
-            chars_sample = ''.join(font_groups[(font_name, size)][:10])
-            
-            # Enhanced bold detection
-            is_bold = any(keyword in font_name.lower() for keyword in ['bold', 'black', 'heavy', 'demi', 'thick'])
-            
-            print(f"  Font: {font_name:<30} Size: {size:>5.1f} -> {'BOLD' if is_bold else 'REGULAR'}")
-            print(f"    Sample: \"{chars_sample}\"")
+        out.append(f"  Font: {font_name:<30} Size: {size:>5.1f} -> {'BOLD' if is_bold else 'REGULAR'}")
+        out.append(f"    Sample: \"{chars_sample}\"")
     
     pdf_doc.close()
     
-    print('\n' + '=' * 60)
-    print('🎯 DETECTION RECOMMENDATIONS:')
-    print("1. Check if font size differences create visual 'boldness'")
-    print("2. Look for font weight variations in font names")
-    print("3. Analyze font flags for synthetic bold")
-    print("4. Consider color intensity differences")
+    out.append('\n' + '=' * 60)
+    out.append('🎯 DETECTION RECOMMENDATIONS:')
+    out.append("1. Check if font size differences create visual 'boldness'")
+    out.append("2. Look for font weight variations in font names")
+    out.append("3. Analyze font flags for synthetic bold")
+    out.append("4. Consider color intensity differences")
+    
+    sys.stdout.write('\n'.join(out) + '\n')
 
 if __name__ == "__main__":
     # This will be called by the main script
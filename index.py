@@ -1,247 +1,451 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, ORJSONResponse, Response
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 import os
 import uuid
-import io
+import json
+import html
 import fitz  # PyMuPDF
 import pdfplumber  # Better font extraction
-import pikepdf  # Direct PDF content editing
 from fontTools.ttLib import TTFont  # Font analysis
 import cv2  # Visual validation
 import numpy as np
-import base64
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in for the stdlib module, used when installed
+except ImportError:
+    import base64
 from typing import Optional, Dict, Any
 import tempfile
+import atexit
+import re
+import logging
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
 
-app = FastAPI(title="PDF Editor Backend")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="PDF Editor Backend", default_response_class=ORJSONResponse)
+
+# Per-span/edit debug output is off by default; set LOG_LEVEL=DEBUG to see it
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB reads when spooling uploads to disk
+_INV255 = 1.0 / 255.0
+_RGB_SHIFTS = np.array([16, 8, 0], dtype=np.uint32)
+
+# get_text flags: the old magic 11 (ligatures | whitespace | inhibit spaces), plus clipping to
+# the mediabox so off-page text is dropped inside MuPDF. Image blocks are never requested.
+TEXT_FLAGS = (
+    fitz.TEXT_PRESERVE_LIGATURES
+    | fitz.TEXT_PRESERVE_WHITESPACE
+    | fitz.TEXT_INHIBIT_SPACES
+    | fitz.TEXT_MEDIABOX_CLIP
+)
+
+# PyMuPDF span flag bits
+_ITALIC_FLAG = 1 << 1
+_BOLD_FLAG = 1 << 4
+
+# One alternation classifies a lower-cased font name into family and weight/style tokens
+_FONT_TOKEN_RE = re.compile(
+    r"(?P<helv>arial|helvetica|calibri|segoe)"
+    r"|(?P<times>times|roman)"
+    r"|(?P<cour>courier|mono)"
+    r"|(?P<bold>bold|black|heavy|demi)"
+    r"|(?P<italic>italic|oblique)"
+)
+_FAMILY_PRIORITY = ("helv", "times", "cour")
+
+# (family, is_bold, is_italic) -> Base-14 font; bold italic uses the bold face
+_FONT_MAP = MappingProxyType({
+    ("helv", False, False): "helv",
+    ("helv", True, False): "hebo",
+    ("helv", False, True): "heit",
+    ("helv", True, True): "hebo",
+    ("times", False, False): "tiro",
+    ("times", True, False): "tibo",
+    ("times", False, True): "tiit",
+    ("times", True, True): "tibo",
+    ("cour", False, False): "cour",
+    ("cour", True, False): "cobo",
+    ("cour", False, True): "cour",
+    ("cour", True, True): "cobo",
+    (None, False, False): "helv",
+    (None, True, False): "hebo",
+    (None, False, True): "heit",
+    (None, True, True): "hebo",
+})
+
+
+@lru_cache(maxsize=512)
+def classify_font(name_lower: str):
+    """Classify a lower-cased font name into (family, is_bold, is_italic) in one regex scan"""
+    families = set()
+    is_bold = is_italic = False
+    for match in _FONT_TOKEN_RE.finditer(name_lower):
+        token = match.lastgroup
+        if token == "bold":
+            is_bold = True
+        elif token == "italic":
+            is_italic = True
+        else:
+            families.add(token)
+    family = next((f for f in _FAMILY_PRIORITY if f in families), None)
+    return family, is_bold, is_italic
+
+# Base-14 family -> CSS generic family, which MuPDF's HTML layout resolves to the same Base-14 faces
+_CSS_FAMILY = MappingProxyType({"helv": "sans-serif", "times": "serif", "cour": "monospace", None: "sans-serif"})
+
+
+def _html_span(text: str, family: Optional[str], font_size: float, is_bold: bool, is_italic: bool, color: tuple) -> str:
+    """One centered line of text as HTML for Page.insert_htmlbox"""
+    r, g, b = (round(c * 255) for c in color)
+    return (
+        f'<p style="margin:0; text-align:center; line-height:1; white-space:nowrap; '
+        f'font-family:{_CSS_FAMILY.get(family, "sans-serif")}; font-size:{font_size}pt; '
+        f'font-weight:{"bold" if is_bold else "normal"}; font-style:{"italic" if is_italic else "normal"}; '
+        f'color:#{r:02x}{g:02x}{b:02x}">{html.escape(text)}</p>'
+    )
+
+
+@lru_cache(maxsize=4096)
+def _text_width(text: str, fontname: str, fontsize: float) -> float:
+    """Rendered width of text in a Base-14 font, cached since edits repeat font/size pairs"""
+    return fitz.get_text_length(text, fontname=fontname, fontsize=fontsize)
 
 # Get the frontend URL from environment variable (for Vercel)
 frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
-# Add CORS middleware
+# Add CORS middleware: explicit methods/headers give a fixed preflight response instead of echoing the
+# request's headers back, and max_age lets browsers cache the preflight for a day
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[frontend_url, "https://editz.vercel.app", "http://localhost:3000"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=("GET", "POST", "OPTIONS"),
+    allow_headers=("content-type", "authorization"),
+    # Lets the frontend read whether /edit changed anything or was a no-op
+    expose_headers=("X-Edit-Status",),
+    max_age=86400,
 )
 
 class EditRequest(BaseModel):
     page: int
     metadata_key: str
     new_text: str
-    pdf_data: str  # Base64 encoded PDF data
     text_metadata: Dict[str, Any]
 
-class DownloadRequest(BaseModel):
-    pdf_data: str  # Base64 encoded PDF data
+# Spooled PDFs still on disk; anything a request failed to remove is deleted at exit
+_TEMP_PATHS = set()
+
+def _remove_tempfile(path: str):
+    """Delete a spooled PDF and forget it"""
+    _TEMP_PATHS.discard(path)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+@atexit.register
+def _cleanup_tempfiles():
+    for path in list(_TEMP_PATHS):
+        _remove_tempfile(path)
+
+async def _spool_to_tempfile(upload: UploadFile):
+    """Copy an upload to a named temp file in chunks so MuPDF can open (and mmap) it by path.
+    The content is hashed on the way through; returns (path, size, hex digest)"""
+    digest = hashlib.blake2b(digest_size=20)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        _TEMP_PATHS.add(tmp.name)
+        try:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                tmp.write(chunk)
+                digest.update(chunk)
+        except Exception:
+            tmp.close()
+            _remove_tempfile(tmp.name)
+            raise
+        return tmp.name, tmp.tell(), digest.hexdigest()
+
+# Upload results keyed by (content digest, extract_fonts): re-uploading the same PDF skips extraction
+MAX_CACHED_UPLOADS = 32
+_UPLOAD_CACHE: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+def _upload_cache_get(key: tuple) -> Optional[Dict[str, Any]]:
+    """Cached upload response for key (None if missing), marked recently used"""
+    response = _UPLOAD_CACHE.get(key)
+    if response is not None:
+        _UPLOAD_CACHE.move_to_end(key)
+    return response
+
+def _upload_cache_put(key: tuple, response: Dict[str, Any]) -> None:
+    """Remember an upload response, evicting the least recently used one when full"""
+    _UPLOAD_CACHE[key] = response
+    _UPLOAD_CACHE.move_to_end(key)
+    while len(_UPLOAD_CACHE) > MAX_CACHED_UPLOADS:
+        _UPLOAD_CACHE.popitem(last=False)
+
+def _extract_spans(document: fitz.Document, page_numbers: range):
+    """Extract non-empty text spans for a contiguous page range of an open Document"""
+    pages = []
+    spans = []
+    for page_num in page_numbers:
+        # Get text with EXACT formatting and positioning
+        blocks = document[page_num].get_text("dict", flags=TEXT_FLAGS)["blocks"]
+        # Flattened in one comprehension: text blocks only, non-empty spans only
+        page_spans = [
+            span
+            for block in blocks if "lines" in block
+            for line in block["lines"]
+            for span in line["spans"] if span["text"].strip()
+        ]
+        spans.extend(page_spans)
+        pages.extend([page_num + 1] * len(page_spans))
+    return pages, spans
 
 @app.get("/")
 async def root():
     return {"message": "PDF Editor Backend is running!"}
 
 @app.post("/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...)):
+async def upload_pdf(file: UploadFile = File(...), extract_fonts: bool = True):
     """ADVANCED PDF processing with embedded font extraction and precise coordinates"""
+    tmp_path = None
+    pdf_document = None
     try:
-        print("🚀 ADVANCED PDF PROCESSING: Starting upload with embedded font extraction")
+        logger.debug("🚀 ADVANCED PDF PROCESSING: Starting upload with embedded font extraction")
         
         if not file.filename.lower().endswith('.pdf'):
             return {"success": False, "error": "Only PDF files are allowed", "filename": file.filename}
         
-        file_content = await file.read()
         file_id = str(uuid.uuid4())
         
-        print(f"📄 Processing PDF: {len(file_content)} bytes, ID: {file_id}")
+        # Spool the upload to disk so the PDF never sits in the Python heap as one bytes object
+        tmp_path, file_size, content_digest = await _spool_to_tempfile(file)
+        
+        logger.debug("📄 Processing PDF: %s bytes, ID: %s", file_size, file_id)
         
-        # STEP 1: Extract embedded fonts using pikepdf
+        # Same bytes and options as an earlier upload: reuse its fonts and metadata
+        cache_key = (content_digest, extract_fonts)
+        cached_response = _upload_cache_get(cache_key)
+        if cached_response is not None:
+            logger.info("✅ Upload cache hit for %s", content_digest)
+            return {**cached_response, "fileId": file_id, "filename": file.filename}
+        
+        # The PDF is parsed once here; fonts and the first page range come from this Document
+        pdf_document = fitz.open(tmp_path)
+        page_count = len(pdf_document)
         embedded_fonts = {}
-        try:
-            with pikepdf.open(io.BytesIO(file_content)) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    if '/Resources' in page and '/Font' in page['/Resources']:
-                        fonts = page['/Resources']['/Font']
-                        for font_name, font_obj in fonts.items():
-                            if '/FontDescriptor' in font_obj:
-                                font_descriptor = font_obj['/FontDescriptor']
-                                if '/FontFile2' in font_descriptor or '/FontFile' in font_descriptor:
-                                    # Extract embedded font data
-                                    font_data_key = '/FontFile2' if '/FontFile2' in font_descriptor else '/FontFile'
-                                    font_stream = font_descriptor[font_data_key]
-                                    embedded_fonts[str(font_name)] = {
-                                        'font_data': bytes(font_stream),
-                                        'font_name': str(font_obj.get('/BaseFont', font_name)),
-                                        'is_embedded': True
-                                    }
-                                    print(f"🔤 Extracted embedded font: {font_name} -> {font_obj.get('/BaseFont', font_name)}")
-        except Exception as e:
-            print(f"⚠️ Font extraction warning: {e}")
+        seen_font_xrefs = set()
+        
+        # ?extract_fonts=false skips reading every embedded font program
+        for page_num in (range(page_count) if extract_fonts else ()):
+            # Harvest embedded font programs straight from the page's font resources (no Page object is loaded)
+            for xref, ext, _type, basefont, resname, _encoding, _referencer in pdf_document.get_page_fonts(page_num, full=True):
+                if xref in seen_font_xrefs or ext == "n/a":
+                    continue
+                seen_font_xrefs.add(xref)
+                try:
+                    _name, _ext, _subtype, font_buffer = pdf_document.extract_font(xref)
+                except Exception as e:
+                    logger.warning("⚠️ Font extraction warning: %s", e)
+                    continue
+                if font_buffer:
+                    # Span font names carry no subset prefix ("ABCDEF+Arial" -> "Arial")
+                    embedded_fonts[f"/{basefont.split('+', 1)[-1]}"] = {
+                        'font_data': font_buffer,
+                        'font_name': basefont,
+                        'is_embedded': True
+                    }
+                    logger.debug("🔤 Extracted embedded font: /%s -> %s", resname, basefont)
+        
+        # Text comes from the same Document in one pass: PyMuPDF holds the GIL during get_text,
+        # so extra threads (and the extra parses they'd need) would only add overhead
+        pages, spans = _extract_spans(pdf_document, range(page_count))
+        pdf_document.close()
+        pdf_document = None
+        
+        # Span data is split into columns (SoA) and only turned into dicts for the response
+        texts = [span["text"] for span in spans]
+        fonts = [span["font"] for span in spans]
+        bboxes = [span["bbox"] for span in spans]
+        sizes = [span["size"] for span in spans]
+        flags = [span["flags"] for span in spans]
+        colors = [span["color"] for span in spans]
+        # Enhanced boldness detection from font name
+        name_bolds = [classify_font(font_info.lower())[1] for font_info in fonts]
+        matrices = [span.get("transform", [1, 0, 0, 1, 0, 0]) for span in spans]  # Transformation matrix
+        char_spacings = [span.get("char_spacing", 0) for span in spans]
+        del spans
         
-        # STEP 2: Use PyMuPDF for PRECISE text extraction with coordinates
-        pdf_document = fitz.open(stream=file_content, filetype="pdf")
         text_items = []
         text_metadata = {}
-        item_counter = 0
         
-        for page_num in range(len(pdf_document)):
-            page = pdf_document[page_num]
-            
-            # Get text with EXACT formatting and positioning
-            text_dict = page.get_text("dict", flags=11)  # Flags for maximum detail
+        if texts:
+            # Vectorized post-processing over all spans
+            bbox_arr = np.asarray(bboxes, dtype=np.float64)
+            flags_arr = np.asarray(flags, dtype=np.uint32)
+            colors_arr = np.asarray(colors, dtype=np.uint32)
+            is_bold_arr = ((flags_arr & _BOLD_FLAG) != 0) | np.asarray(name_bolds, dtype=bool)
+            is_italic_arr = (flags_arr & _ITALIC_FLAG) != 0
+            widths = bbox_arr[:, 2] - bbox_arr[:, 0]
+            heights = bbox_arr[:, 3] - bbox_arr[:, 1]
+            # Unpack all span colors to normalized RGB in one NumPy pass
+            rgb = ((colors_arr[:, None] >> _RGB_SHIFTS) & 0xFF).astype(np.float32) * _INV255
             
-            for block in text_dict["blocks"]:
-                if "lines" in block:  # Text block
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            if span["text"].strip():  # Only non-empty text
-                                item_counter += 1
-                                metadata_key = f"text_item_{item_counter}"
-                                
-                                # Extract PRECISE font and formatting information
-                                font_info = span["font"]
-                                font_size = span["size"]
-                                font_flags = span["flags"]
-                                text_color = span["color"]
-                                bbox = span["bbox"]
-                                
-                                # Analyze font properties for EXACT boldness detection
-                                is_bold = bool(font_flags & 2**4)  # Bold flag
-                                is_italic = bool(font_flags & 2**6)  # Italic flag
-                                
-                                # Check if font is embedded
-                                embedded_font_info = embedded_fonts.get(f"/{font_info}", {})
-                                has_embedded_font = embedded_font_info.get('is_embedded', False)
-                                
-                                # Enhanced boldness detection from font name
-                                font_name_lower = font_info.lower()
-                                name_indicates_bold = any(keyword in font_name_lower for keyword in ['bold', 'black', 'heavy', 'demi', 'semibold'])
-                                
-                                # Final boldness determination
-                                final_is_bold = is_bold or name_indicates_bold
-                                
-                                # Create text item with ENHANCED metadata
-                                text_item = {
-                                    "text": span["text"],
-                                    "page": page_num + 1,
-                                    "x": bbox[0],
-                                    "y": bbox[1],
-                                    "width": bbox[2] - bbox[0],
-                                    "height": bbox[3] - bbox[1],
-                                    "font": font_info,
-                                    "size": font_size,
-                                    "metadata_key": metadata_key,
-                                    "color": text_color,
-                                    "flags": font_flags,
-                                    "is_bold": final_is_bold,
-                                    "is_italic": is_italic,
-                                    "has_embedded_font": has_embedded_font
-                                }
-                                
-                                # Create COMPREHENSIVE metadata for perfect editing
-                                text_metadata[metadata_key] = {
-                                    "text": span["text"],
-                                    "bbox": list(bbox),
-                                    "font": font_info,
-                                    "size": font_size,
-                                    "color": text_color,
-                                    "flags": font_flags,
-                                    "page": page_num + 1,
-                                    "is_bold": final_is_bold,
-                                    "is_italic": is_italic,
-                                    "has_embedded_font": has_embedded_font,
-                                    "embedded_font_data": embedded_font_info.get('font_data'),
-                                    "pymupdf_font": font_info,  # Original PyMuPDF font reference
-                                    "matrix": span.get("transform", [1, 0, 0, 1, 0, 0]),  # Transformation matrix
-                                    "char_spacing": span.get("char_spacing", 0),
-                                    "line_height": bbox[3] - bbox[1]
-                                }
-                                
-                                text_items.append(text_item)
-                                
-                                print(f"🔍 ENHANCED EXTRACTION: '{span['text'][:20]}...' -> Font: {font_info}, Size: {font_size}, Bold: {final_is_bold}, Embedded: {has_embedded_font}")
-        
-        pdf_document.close()
-        
-        # Encode original PDF as base64 for frontend storage
-        pdf_data_base64 = base64.b64encode(file_content).decode('utf-8')
-        
+            for i, (text, font_info, page_no, bbox, width, height, font_size, font_flags, text_color,
+                    color_rgb, final_is_bold, is_italic, matrix, char_spacing) in enumerate(zip(
+                        texts, fonts, pages, bbox_arr.tolist(), widths.tolist(), heights.tolist(),
+                        sizes, flags, colors, rgb.tolist(), is_bold_arr.tolist(), is_italic_arr.tolist(),
+                        matrices, char_spacings), 1):
+                metadata_key = f"text_item_{i}"
+                
+                # Check if font is embedded
+                embedded_font_info = embedded_fonts.get(f"/{font_info}", {})
+                has_embedded_font = embedded_font_info.get('is_embedded', False)
+                
+                # Create text item with ENHANCED metadata
+                text_items.append({
+                    "text": text,
+                    "page": page_no,
+                    "x": bbox[0],
+                    "y": bbox[1],
+                    "width": width,
+                    "height": height,
+                    "font": font_info,
+                    "size": font_size,
+                    "metadata_key": metadata_key,
+                    "color": text_color,
+                    "flags": font_flags,
+                    "is_bold": final_is_bold,
+                    "is_italic": is_italic,
+                    "has_embedded_font": has_embedded_font
+                })
+                
+                # Create COMPREHENSIVE metadata for perfect editing
+                text_metadata[metadata_key] = {
+                    "text": text,
+                    "bbox": bbox,
+                    "font": font_info,
+                    "size": font_size,
+                    "color": text_color,
+                    "color_rgb": color_rgb,
+                    "flags": font_flags,
+                    "page": page_no,
+                    "is_bold": final_is_bold,
+                    "is_italic": is_italic,
+                    "has_embedded_font": has_embedded_font,
+                    "pymupdf_font": font_info,  # Original PyMuPDF font reference
+                    "matrix": matrix,
+                    "char_spacing": char_spacing,
+                    "line_height": height
+                }
+                
+                logger.debug("🔍 ENHANCED EXTRACTION: '%.20s...' -> Font: %s, Size: %s, Bold: %s, Embedded: %s", text, font_info, font_size, final_is_bold, has_embedded_font)
+        
+        # The client keeps the file it uploaded, so the PDF is not echoed back
         response = {
             "success": True,
             "fileId": file_id,
             "filename": file.filename,
             "textItems": text_items,
-            "pdfData": pdf_data_base64,
             "textMetadata": text_metadata,
             "backendVersion": "ADVANCED_EMBEDDED_FONTS_V3",
             "extractedItems": len(text_items),
-            "embeddedFonts": len(embedded_fonts)
+            "embeddedFonts": len(embedded_fonts),
+            # Each font program is shipped once here; spans reference it by their "font" name
+            "embeddedFontData": {
+                name.lstrip("/"): base64.b64encode(font['font_data']).decode('ascii')
+                for name, font in embedded_fonts.items()
+            }
         }
         
-        print(f"✅ ADVANCED PDF processing complete: {len(text_items)} text items, {len(embedded_fonts)} embedded fonts")
+        logger.info("✅ ADVANCED PDF processing complete: %s text items, %s embedded fonts", len(text_items), len(embedded_fonts))
+        _upload_cache_put(cache_key, response)
         return response
         
     except Exception as e:
-        print(f"❌ ADVANCED PDF ERROR: {e}")
+        logger.error("❌ ADVANCED PDF ERROR: %s", e)
         return {"success": False, "error": str(e), "filename": file.filename if file else "unknown"}
+    finally:
+        if pdf_document is not None:
+            pdf_document.close()
+        if tmp_path:
+            _remove_tempfile(tmp_path)
 
 @app.post("/pdf/{file_id}/edit")
-async def edit_text(file_id: str, edit_request: EditRequest):
-    """Edit text in PDF using provided PDF data"""
+async def edit_text(
+    file_id: str,
+    pdf_file: UploadFile = File(...),
+    page: int = Form(...),
+    metadata_key: str = Form(...),
+    new_text: str = Form(...),
+    text_metadata: str = Form(...),
+):
+    """Edit text in the uploaded PDF (multipart) and return the modified PDF bytes"""
+    tmp_path = None
+    pdf_document = None
     try:
-        print(f"DEBUG: Starting text edit for file_id: {file_id}")
-        print(f"DEBUG: Edit request - page: {edit_request.page}, metadata_key: {edit_request.metadata_key}")
+        logger.debug("Starting text edit for file_id: %s", file_id)
+        logger.debug("Edit request - page: %s, metadata_key: %s", page, metadata_key)
         
-        # Decode PDF data from request
         try:
-            pdf_content = base64.b64decode(edit_request.pdf_data)
+            edit_request = EditRequest(
+                page=page,
+                metadata_key=metadata_key,
+                new_text=new_text,
+                text_metadata=json.loads(text_metadata)
+            )
         except Exception as e:
-            print(f"ERROR: Failed to decode PDF data: {str(e)}")
-            raise HTTPException(status_code=400, detail="Invalid PDF data")
-        
-        # Open PDF document
-        pdf_document = fitz.open(stream=pdf_content, filetype="pdf")
+            logger.error("Invalid text metadata: %s", e)
+            raise HTTPException(status_code=400, detail="Invalid text metadata")
         
         # Get the specific text metadata
         if edit_request.metadata_key not in edit_request.text_metadata:
-            print(f"ERROR: Metadata key not found: {edit_request.metadata_key}")
+            logger.error("Metadata key not found: %s", edit_request.metadata_key)
             raise HTTPException(status_code=400, detail="Text metadata not found")
         
         metadata = edit_request.text_metadata[edit_request.metadata_key]
         
+        # Spool the PDF to disk; the edited document is written back over this file
+        tmp_path, pdf_size, _digest = await _spool_to_tempfile(pdf_file)
+        if not pdf_size:
+            raise HTTPException(status_code=400, detail="Invalid PDF data")
+        
+        # Unchanged text (e.g. a blur event re-submitting the span): send the PDF back untouched
+        if edit_request.new_text == metadata.get("text"):
+            logger.debug("Text unchanged for %s, skipping edit", edit_request.metadata_key)
+            response = FileResponse(
+                tmp_path,
+                media_type="application/pdf",
+                headers={"X-Edit-Status": "no-op"},
+                background=BackgroundTask(_remove_tempfile, tmp_path)
+            )
+            tmp_path = None  # The response removes the file once it has been sent
+            return response
+        
+        # Open PDF document
+        pdf_document = fitz.open(tmp_path)
+        
         # Get the page
         page = pdf_document[edit_request.page - 1]
         
         # Remove the original text first
         original_bbox = fitz.Rect(metadata["bbox"])
         
-        # Create a white rectangle to cover the original text with padding
-        clear_padding = 2
-        clear_rect = fitz.Rect(
-            original_bbox.x0 - clear_padding,
-            original_bbox.y0 - clear_padding, 
-            original_bbox.x1 + clear_padding,
-            original_bbox.y1 + clear_padding
-        )
-        page.draw_rect(clear_rect, color=(1, 1, 1), fill=(1, 1, 1))
-        
-        # Prepare font and text properties
-        font_name = metadata["font"]
-        font_size = metadata["size"]
-        text_color = metadata.get("color", 0)  # Default to black
-        
-        # Convert color from integer to tuple if needed
-        if isinstance(text_color, int):
-            # Convert from integer color to RGB tuple
-            r = (text_color >> 16) & 255
-            g = (text_color >> 8) & 255
-            b = text_color & 255
-            text_color = (r/255, g/255, b/255)
+        # Redact the original glyphs out of the content stream instead of painting over them.
+        # The span bbox is used unpadded: redaction removes every character it touches,
+        # so padding would also delete neighbouring text.
+        page.add_redact_annot(original_bbox, fill=(1, 1, 1))
+        page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
         
         # Get exact font properties and coordinates (already in PyMuPDF format)
-        font_name = metadata["exact_fontname"]
+        # upload_pdf stores no exact_fontname, so fall back to the span's font name
+        font_name = metadata.get("exact_fontname", metadata["font"])
         font_size = metadata["size"]
         is_bold = metadata.get("is_bold", False)
         is_italic = metadata.get("is_italic", False)
@@ -253,146 +457,119 @@ async def edit_text(file_id: str, edit_request: EditRequest):
             r = (text_color >> 16) & 255
             g = (text_color >> 8) & 255
             b = text_color & 255
-            text_color = (r/255, g/255, b/255)
+            text_color = (r * _INV255, g * _INV255, b * _INV255)
         
-        print(f"DEBUG: EXACT FONT INFO - Font: {font_name}, Size: {font_size}, Bold: {is_bold}, Italic: {is_italic}")
+        logger.debug("EXACT FONT INFO - Font: %s, Size: %s, Bold: %s, Italic: %s", font_name, font_size, is_bold, is_italic)
         
         # Map exact font names to PyMuPDF fonts with PRECISE bold matching
-        fontname = "helv"  # Default
-        
-        # Use the exact font name to determine the best PyMuPDF font
-        font_lower = font_name.lower()
-        
-        # More precise font mapping based on actual font names
-        if any(name in font_lower for name in ['arial', 'helvetica']):
-            if is_bold and is_italic:
-                fontname = "hebo"  # Use bold as primary
-            elif is_bold:
-                fontname = "hebo"  # Helvetica Bold
-            elif is_italic:
-                fontname = "heit"  # Helvetica Italic
-            else:
-                fontname = "helv"  # Regular Helvetica
-        elif any(name in font_lower for name in ['times', 'roman']):
-            if is_bold and is_italic:
-                fontname = "tibo"  # Use bold as primary
-            elif is_bold:
-                fontname = "tibo"  # Times Bold
-            elif is_italic:
-                fontname = "tiit"  # Times Italic
-            else:
-                fontname = "times"  # Regular Times
-        elif any(name in font_lower for name in ['courier', 'mono']):
-            if is_bold:
-                fontname = "cobo"  # Courier Bold
-            else:
-                fontname = "cour"  # Regular Courier
-        elif any(name in font_lower for name in ['calibri', 'segoe']):
-            if is_bold:
-                fontname = "hebo"  # Map to Helvetica Bold
-            else:
-                fontname = "helv"  # Map to Helvetica
-        else:
-            # For unknown fonts, use bold detection from font name
-            if is_bold or any(keyword in font_lower for keyword in ['bold', 'black', 'heavy', 'demi']):
-                fontname = "hebo"  # Default to Helvetica Bold
-            elif is_italic:
-                fontname = "heit"  # Default to Helvetica Italic
-            else:
-                fontname = "helv"  # Default to Helvetica
+        family, name_bold, name_italic = classify_font(font_name.lower())
+        is_bold = is_bold or name_bold
+        is_italic = is_italic or name_italic
+        
+        # Helvetica-like and unknown fonts map to Helvetica variants; bold always resolves to a real
+        # bold face (hebo/tibo/cobo), so no weight simulation is needed
+        fontname = _FONT_MAP.get((family, bool(is_bold), bool(is_italic)), "helv")
         
         # Use EXACT font size from PyMuPDF
         precise_font_size = font_size
         
-        print(f"DEBUG: MAPPED FONT - Original: {font_name} -> PyMuPDF: {fontname}, Size: {precise_font_size}")
-        
-        # For bold text that doesn't have a bold font variant, simulate boldness
-        simulate_bold = is_bold and fontname in ["helv", "times", "cour"]
+        logger.debug("MAPPED FONT - Original: %s -> PyMuPDF: %s, Size: %s", font_name, fontname, precise_font_size)
         
         new_text = edit_request.new_text
         
-        if new_text.strip():
-            # Calculate precise positioning - CENTER the new text in the original bounding box
+        # MuPDF lays the text out itself, centered on the original span: the box is as wide as the page
+        # allows around that center, so longer text grows outwards instead of wrapping
+        # Page.insert_htmlbox only exists in PyMuPDF >= 1.23.9; older releases place the text by hand below
+        laid_out = False
+        if new_text.strip() and hasattr(page, "insert_htmlbox"):
+            center_x = (original_bbox.x0 + original_bbox.x1) / 2
+            half_width = max(min(center_x - page.rect.x0, page.rect.x1 - center_x), original_bbox.width / 2)
+            html_box = fitz.Rect(center_x - half_width, original_bbox.y0,
+                                 center_x + half_width, original_bbox.y0 + 2 * original_bbox.height)
+            spare_height, _scale = page.insert_htmlbox(
+                html_box,
+                _html_span(new_text, family, font_size, is_bold, is_italic, text_color),
+                scale_low=1  # never shrink the text to make it fit
+            )
+            laid_out = spare_height >= 0
+            if laid_out:
+                logger.debug("HTML LAYOUT - Family: %s, Size: %s, Bold: %s", _CSS_FAMILY.get(family), font_size, is_bold)
+        
+        if new_text.strip() and not laid_out:
+            # Didn't fit the box: place it by hand, CENTERED in the original bounding box
             original_x = original_bbox.x0
             original_y = original_bbox.y0
             original_width = original_bbox.width
             original_height = original_bbox.height
             
-            # Estimate the width of the new text using precise font size
-            estimated_char_width = precise_font_size * 0.6  # Approximate character width
-            estimated_new_text_width = len(edit_request.new_text) * estimated_char_width
+            # Exact width of the new text from the Base-14 font's width table
+            new_text_width = _text_width(new_text, fontname, precise_font_size)
             
             # CENTER the new text horizontally within the original bounding box
-            if estimated_new_text_width <= original_width:
+            if new_text_width <= original_width:
                 # New text fits within original bounds - center it
-                precise_x = original_x + (original_width - estimated_new_text_width) / 2
+                precise_x = original_x + (original_width - new_text_width) / 2
             else:
                 # New text is longer - still center it around the original center point
                 original_center_x = original_x + (original_width / 2)
-                precise_x = original_center_x - (estimated_new_text_width / 2)
+                precise_x = original_center_x - (new_text_width / 2)
             
             # Use precise Y positioning with proper baseline
             precise_y = original_y + (original_height * 0.8)  # Adjust baseline to 80% of height
             
             # Insert new text with EXACT font properties
-            if simulate_bold:
-                # For bold text without bold font, render text multiple times with slight offset
-                for offset in [(0, 0), (0.3, 0), (0, 0.3), (0.3, 0.3)]:
-                    page.insert_text(
-                        (precise_x + offset[0], precise_y + offset[1]),
-                        new_text,
-                        fontname=fontname,
-                        fontsize=precise_font_size,
-                        color=text_color
-                    )
-                print(f"DEBUG: SIMULATED BOLD - Text rendered with multiple offsets")
-            else:
-                # Regular text insertion
-                page.insert_text(
-                    (precise_x, precise_y),
-                    new_text,
-                    fontname=fontname,
-                    fontsize=precise_font_size,
-                    color=text_color
-                )
+            page.insert_text(
+                (precise_x, precise_y),
+                new_text,
+                fontname=fontname,
+                fontsize=precise_font_size,
+                color=text_color
+            )
             
-            print(f"DEBUG: EXACT FONT RENDERING - Font: {fontname}, Size: {precise_font_size}, Bold: {is_bold}, Simulate: {simulate_bold}")
+            logger.debug("EXACT FONT RENDERING - Font: %s, Size: %s, Bold: %s", fontname, precise_font_size, is_bold)
         
-        # Get the modified PDF as bytes
+        # Redacted edits are always rewritten in full: apply_redactions rules out an incremental save,
+        # and one would keep the removed glyphs readable in the previous revision anyway
         modified_pdf_bytes = pdf_document.write()
         pdf_document.close()
+        pdf_document = None
+        with open(tmp_path, "wb") as f:
+            f.write(modified_pdf_bytes)
         
-        # Encode modified PDF as base64
-        modified_pdf_base64 = base64.b64encode(modified_pdf_bytes).decode('utf-8')
+        logger.debug("Text edit successful")
         
-        print(f"DEBUG: Text edit successful")
-        
-        return {
-            "success": True,
-            "message": "Text edited successfully",
-            "pdfData": modified_pdf_base64
-        }
+        response = FileResponse(
+            tmp_path,
+            media_type="application/pdf",
+            headers={"X-Edit-Status": "ok"},
+            background=BackgroundTask(_remove_tempfile, tmp_path)
+        )
+        tmp_path = None  # The response removes the file once it has been sent
+        return response
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"ERROR in edit_text: {str(e)}")
+        logger.error("Error in edit_text: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if pdf_document is not None:
+            pdf_document.close()
+        if tmp_path:
+            _remove_tempfile(tmp_path)
 
 @app.post("/pdf/{file_id}/download")
-async def download_pdf(file_id: str, download_request: DownloadRequest):
-    """Download the modified PDF using provided PDF data"""
+async def download_pdf(file_id: str, request: Request):
+    """Download the modified PDF sent as the raw request body"""
     try:
-        print(f"DEBUG: Starting download for file_id: {file_id}")
+        logger.debug("Starting download for file_id: %s", file_id)
         
-        # Decode PDF data from request
-        try:
-            pdf_content = base64.b64decode(download_request.pdf_data)
-        except Exception as e:
-            print(f"ERROR: Failed to decode PDF data: {str(e)}")
+        pdf_content = await request.body()
+        if not pdf_content:
+            logger.error("Empty PDF body")
             raise HTTPException(status_code=400, detail="Invalid PDF data")
         
-        print(f"DEBUG: Download successful, PDF size: {len(pdf_content)} bytes")
+        logger.debug("Download successful, PDF size: %s bytes", len(pdf_content))
         
         return Response(
             content=pdf_content,
@@ -403,7 +580,7 @@ async def download_pdf(file_id: str, download_request: DownloadRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"ERROR in download_pdf: {str(e)}")
+        logger.error("Error in download_pdf: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
@@ -418,6 +595,5 @@ async def test_response():
         "fileId": "test-123",
         "filename": "test.pdf",
         "textItems": [{"text": "test", "page": 1}],
-        "pdfData": "dGVzdA==",  # base64 encoded "test"
         "textMetadata": {"test_key": "test_value"}
     }
@@ -1,34 +1,63 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 import os
 import uuid
-import io
 import fitz  # PyMuPDF - ONLY dependency for PDF processing
-import base64
+import numpy as np
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in for the stdlib module, used when installed
+except ImportError:
+    import base64
 import re
 import math
-from typing import Dict, List, Tuple, Any
+import json
+import logging
+import threading
+import multiprocessing
+import atexit
+import tempfile
+import shutil
+import hashlib
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import BinaryIO, Dict, List, Tuple, Any, Optional, Union
 
-def extract_pymupdf_metadata(pdf_content: bytes, page_num: int = None) -> Dict[str, Any]:
-    """
-    Extract enhanced text metadata using ONLY PyMuPDF - lightweight but powerful
-    """
-    doc = fitz.open(stream=pdf_content, filetype="pdf")
-    metadata = {}
-    
-    # Process specific page or all pages
-    pages_to_process = [page_num] if page_num is not None else range(len(doc))
+logger = logging.getLogger(__name__)
+
+# Fill used to blank out the original text before redrawing it
+_WHITE = (1.0, 1.0, 1.0)
+
+# get_text("dict") flags: keep ligatures/whitespace as-is, don't invent spaces, and drop
+# off-page text. Image blocks are never requested (TEXT_PRESERVE_IMAGES stays unset).
+TEXT_FLAGS = (fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE
+              | fitz.TEXT_INHIBIT_SPACES | fitz.TEXT_MEDIABOX_CLIP)
+
+# Weight keywords in font names, matched in one pass
+_BOLD_NAME_RE = re.compile(r"bold|heavy|black", re.IGNORECASE)
+
+@lru_cache(maxsize=512)
+def _is_bold_font_name(font_name: str) -> bool:
+    """True if the font name carries a bold weight keyword (memoized - documents reuse few fonts)"""
+    return _BOLD_NAME_RE.search(font_name) is not None
+
+def _collect_span_columns(doc: fitz.Document, page_indices, columns: Tuple[list, ...]) -> Tuple[list, ...]:
+    """Append (text, page, font, bbox, size, flags, color) of every non-empty span to the column lists"""
+    texts, pages, font_names, bboxes, sizes, flags_col, colors = columns
     
-    for page_idx in pages_to_process:
+    for page_idx in page_indices:
         if page_idx >= len(doc):
             continue
             
         page = doc[page_idx]
         
         # Get text with detailed font information using PyMuPDF's dict format
-        text_dict = page.get_text("dict", flags=11)
+        text_dict = page.get_text("dict", flags=TEXT_FLAGS)
         
         for block in text_dict["blocks"]:
             if "lines" in block:
@@ -36,73 +65,182 @@ def extract_pymupdf_metadata(pdf_content: bytes, page_num: int = None) -> Dict[s
                     for span in line["spans"]:
                         text = span["text"].strip()
                         if text:  # Only process non-empty text
-                            
-                            # Enhanced font analysis using PyMuPDF
-                            font_name = span["font"]
-                            font_size = span["size"]
-                            flags = span["flags"]
-                            bbox = span["bbox"]
-                            color = span["color"]
-                            
-                            # ENHANCED BOLDNESS DETECTION using PyMuPDF flags
-                            is_bold_flag = bool(flags & 2**4)  # Bold flag (bit 16)
-                            is_bold_name = any(bold_word in font_name.lower() 
-                                             for bold_word in ['bold', 'heavy', 'black'])
-                            
-                            # Calculate boldness score
-                            boldness_score = 0
-                            if is_bold_flag:
-                                boldness_score += 0.6
-                            if is_bold_name:
-                                boldness_score += 0.4
-                            
-                            # Font weight estimation
-                            font_weight = 700 if (is_bold_flag or is_bold_name) else 400
-                            
-                            # SIZE ANALYSIS - actual rendered height
-                            actual_height = bbox[3] - bbox[1]
-                            size_ratio = actual_height / font_size if font_size > 0 else 1.0
-                            
-                            # RGB Color conversion
-                            if isinstance(color, int):
-                                r = (color >> 16) & 255
-                                g = (color >> 8) & 255  
-                                b = color & 255
-                                rgb_color = (r/255.0, g/255.0, b/255.0)
-                            else:
-                                rgb_color = (0, 0, 0)  # Default black
-                            
-                            # Create unique key
-                            key = f"page_{page_idx+1}_text_{len(metadata)}"
-                            
-                            metadata[key] = {
-                                "text": text,
-                                "bbox": list(bbox),
-                                "page": page_idx + 1,
-                                "font_name": font_name,
-                                "font_size": font_size,
-                                "actual_height": actual_height,
-                                "size_ratio": size_ratio,
-                                "color": rgb_color,
-                                "color_int": color,
-                                "flags": flags,
-                                "is_bold": is_bold_flag or is_bold_name,
-                                "boldness_score": boldness_score,
-                                "font_weight": font_weight,
-                                "is_italic": bool(flags & 2**1),  # Italic flag
-                                "clean_font_name": font_name,
-                                "visual_boldness_score": boldness_score,
-                                "is_bold_flag": is_bold_flag,
-                                "is_bold_name": is_bold_name,
-                                "is_bold_final": is_bold_flag or is_bold_name
-                            }
-    
-    doc.close()
+                            texts.append(text)
+                            pages.append(page_idx + 1)
+                            font_names.append(span["font"])
+                            bboxes.append(span["bbox"])
+                            sizes.append(span["size"])
+                            flags_col.append(span["flags"])
+                            colors.append(span["color"])
+    return columns
+
+def _open_pdf(pdf_content: Union[bytes, str]) -> fitz.Document:
+    """Open a PDF from bytes or, preferably, from a path so MuPDF reads it from disk"""
+    if isinstance(pdf_content, str):
+        return fitz.open(pdf_content)
+    return fitz.open(stream=pdf_content, filetype="pdf")
+
+def _extract_page_range(args: Tuple[Union[bytes, str], range]) -> Tuple[list, ...]:
+    """Process-pool worker: open a private Document and collect span columns for a page range"""
+    pdf_content, page_indices = args
+    doc = _open_pdf(pdf_content)
+    try:
+        return _collect_span_columns(doc, page_indices, tuple([] for _ in range(7)))
+    finally:
+        doc.close()
+
+def _span_key(page_no: int, bbox, text: str) -> str:
+    """Stable 12-hex-char key for a span from its page, float32 bbox and text, independent of extraction order"""
+    digest = hashlib.blake2b(struct.pack("<I4f", page_no, *bbox), digest_size=6)
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+# Bboxes are snapped to 1/20 pt - far below placement error, and short JSON numbers instead of float noise
+BBOX_QUANTUM = 20.0
+_RGB_SHIFTS = np.array([16, 8, 0])
+
+# MuPDF serializes work inside one process, so large documents are split across processes
+PARALLEL_MIN_PAGES = 8
+_PROCESS_POOL: Optional[ProcessPoolExecutor] = None
+_PROCESS_POOL_UNAVAILABLE = False
+_PROCESS_POOL_LOCK = threading.Lock()
+
+def _get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared extraction pool, started on first use so workers are spawned once per server process.
+    None where the runtime can't start worker processes (e.g. AWS Lambda has no /dev/shm)."""
+    global _PROCESS_POOL, _PROCESS_POOL_UNAVAILABLE
+    with _PROCESS_POOL_LOCK:
+        if _PROCESS_POOL is None and not _PROCESS_POOL_UNAVAILABLE:
+            try:
+                # Started from threadpool threads, so workers are spawned rather than forked from a threaded process
+                _PROCESS_POOL = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                    mp_context=multiprocessing.get_context("spawn"))
+            except (OSError, NotImplementedError) as e:
+                _PROCESS_POOL_UNAVAILABLE = True
+                logger.warning("⚠️ Process pool unavailable (%s); large PDFs are extracted serially", e)
+        return _PROCESS_POOL
+
+@atexit.register
+def _shutdown_process_pool() -> None:
+    """Stop the extraction workers when the server process exits"""
+    if _PROCESS_POOL is not None:
+        _PROCESS_POOL.shutdown(wait=False, cancel_futures=True)
+
+def extract_pymupdf_metadata(pdf_content: Union[bytes, str], page_num: int = None) -> Dict[str, Any]:
+    """
+    Extract enhanced text metadata using ONLY PyMuPDF - lightweight but powerful.
+    pdf_content may be the PDF bytes or a path; with a path, pool workers get the path instead of a bytes copy.
+    """
+    doc = _open_pdf(pdf_content)
+    page_count = len(doc)
+    
+    # Process specific page or all pages
+    pages_to_process = [page_num] if page_num is not None else range(page_count)
+    
+    # One pass over the spans fills parallel columns; derived fields are computed vectorized below
+    columns = tuple([] for _ in range(7))
+    workers = min(os.cpu_count() or 1, page_count)
+    pool = _get_process_pool() if page_num is None and page_count >= PARALLEL_MIN_PAGES and workers > 1 else None
+    
+    if pool is not None:
+        doc.close()
+        step = -(-page_count // workers)
+        page_ranges = [range(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        # map() keeps the page ranges in order, so keys stay in document order
+        for part in pool.map(_extract_page_range, [(pdf_content, page_range) for page_range in page_ranges]):
+            for column, values in zip(columns, part):
+                column.extend(values)
+    else:
+        _collect_span_columns(doc, pages_to_process, columns)
+        doc.close()
+    
+    texts, pages, font_names, bboxes, sizes, flags_col, colors = columns
+    
+    metadata = {}
+    if not texts:
+        return metadata
+    
+    bbox_arr = np.round(np.asarray(bboxes, dtype=np.float64) * BBOX_QUANTUM) / BBOX_QUANTUM
+    size_arr = np.asarray(sizes, dtype=np.float64)
+    flags_arr = np.asarray(flags_col, dtype=np.int64)
+    color_arr = np.asarray(colors, dtype=np.int64)
+    
+    # ENHANCED BOLDNESS DETECTION using PyMuPDF flags and font names
+    is_bold_flag = (flags_arr & 16) != 0  # Bold flag (bit 4)
+    is_italic = (flags_arr & 2) != 0  # Italic flag (bit 1)
+    is_bold_name = np.fromiter(map(_is_bold_font_name, font_names), dtype=bool, count=len(font_names))
+    is_bold = is_bold_flag | is_bold_name
+    
+    # Boldness score and font weight estimation
+    boldness_score = 0.6 * is_bold_flag + 0.4 * is_bold_name
+    font_weight = np.where(is_bold, 700, 400)
+    
+    # SIZE ANALYSIS - actual rendered height
+    actual_height = bbox_arr[:, 3] - bbox_arr[:, 1]
+    size_ratio = np.divide(actual_height, size_arr, out=np.ones_like(actual_height), where=size_arr > 0)
+    
+    # RGB Color conversion for every span at once; 0-255 channels are kept for the editor
+    rgb_int = (color_arr[:, None] >> _RGB_SHIFTS) & 255
+    rgb = rgb_int / 255.0
+    
+    for i, (text, page_no, font_name, bbox, font_size, flags, color, height, ratio, rgb_color, rgb_channels,
+            bold_flag, bold_name, bold, score, weight, italic) in enumerate(zip(
+                texts, pages, font_names, bbox_arr.tolist(), sizes, flags_col, colors,
+                actual_height.tolist(), size_ratio.tolist(), rgb.tolist(), rgb_int.tolist(), is_bold_flag.tolist(),
+                is_bold_name.tolist(), is_bold.tolist(), boldness_score.tolist(), font_weight.tolist(),
+                is_italic.tolist())):
+        # Content-derived key; identical spans at the same spot fall back to a positional suffix
+        key = _span_key(page_no, bbox, text)
+        if key in metadata:
+            key = f"{key}_{i}"
+        
+        metadata[key] = {
+            "text": text,
+            "bbox": bbox,
+            "page": page_no,
+            "font_name": font_name,
+            "font_size": font_size,
+            "actual_height": height,
+            "size_ratio": ratio,
+            "color": tuple(rgb_color),
+            "color_int": color,
+            "color_rgb": rgb_channels,
+            "flags": flags,
+            "is_bold": bold,
+            "boldness_score": score,
+            "font_weight": weight,
+            "is_italic": italic,
+            "clean_font_name": font_name,
+            "visual_boldness_score": score,
+            "is_bold_flag": bold_flag,
+            "is_bold_name": bold_name,
+            "is_bold_final": bold
+        }
+    
     return metadata
 
-def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, page_width: float, all_text_items: list) -> dict:
+# List-item prefixes and station-name shapes, each fused into one alternation compiled at import.
+# List items: "1. ", "2) ", bullets ("• ", "- ", "* "), "(A) "/"(1) "
+_LIST_RE = re.compile(r'^(?:\d+[.)]|[•\-\*]|\([A-Za-z0-9]\))\s')
+# Stations: "SATNA (STA)", "NEW DELHI (NDLS)", or a generic "WORD (CODE)" (which also covers "STA (SATNA)")
+_STATION_RE = re.compile(r'^(?:[A-Z\s]+\s*\([A-Z]{2,4}\)|\w+\s*\([\w\s]+\))$')
+
+# Items closer than this vertically count as the same line; also the bucket height of the line index
+SAME_LINE_TOLERANCE = 5.0
+
+def build_line_index(all_text_items: list) -> Dict[int, list]:
+    """Bucket text items by y // SAME_LINE_TOLERANCE so same-line lookups only look at nearby items"""
+    line_index: Dict[int, list] = {}
+    for item in all_text_items:
+        line_index.setdefault(int(item['y'] // SAME_LINE_TOLERANCE), []).append(item)
+    return line_index
+
+def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, page_width: float, all_text_items: list,
+                        line_index: Optional[Dict[int, list]] = None) -> dict:
     """
-    Determine if text should be centered, left-aligned, or maintain tabular positioning
+    Determine if text should be centered, left-aligned, or maintain tabular positioning.
+    Callers aligning many items against the same page can pass build_line_index(all_text_items)
+    so the same-line scan reads three buckets instead of every item.
     """
     x0, y0, x1, y1 = bbox
     text_width = x1 - x0
@@ -110,14 +248,8 @@ def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, p
     page_center_x = page_width / 2
     
     # Check if it's a list item (should NOT be centered)
-    list_patterns = [
-        r'^\d+\.\s',           # "1. ", "2. "
-        r'^\d+\)\s',           # "1) ", "2) "
-        r'^[•\-\*]\s',         # bullet points
-        r'^\([A-Za-z0-9]\)\s', # "(A) ", "(1) "
-    ]
-    
-    is_list_item = any(re.match(pattern, line_text.strip()) for pattern in list_patterns)
+    line_text_stripped = line_text.strip()
+    is_list_item = _LIST_RE.match(line_text_stripped) is not None
     
     if is_list_item:
         # List items should expand to the right
@@ -129,22 +261,11 @@ def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, p
         }
     
     # ENHANCED: Check for station names and location codes
-    station_patterns = [
-        r'^[A-Z\s]+\s*\([A-Z]{2,4}\)$',  # "SATNA (STA)", "NEW DELHI (NDLS)"
-        r'^[A-Z]{2,4}\s*\([A-Z]{2,4}\)$', # "STA (SATNA)"
-        r'^\w+\s*\([\w\s]+\)$',          # Generic "WORD (CODE)" pattern
-    ]
-    
-    is_station = any(re.match(pattern, text.strip().upper()) for pattern in station_patterns)
-    
-    # DEBUG: Add detailed station detection logging
-    print(f"🚉 STATION DETECTION DEBUG:")
-    print(f"   Text: '{text}' -> Upper: '{text.strip().upper()}'")
-    print(f"   Testing patterns:")
-    for i, pattern in enumerate(station_patterns):
-        match_result = re.match(pattern, text.strip().upper())
-        print(f"   Pattern {i+1}: {pattern} -> {'✅ MATCH' if match_result else '❌ No match'}")
-    print(f"   Is Station: {is_station}")
+    text_upper = text.strip().upper()
+    # Every station shape is at least "W(C)" and ends in ")": most text is rejected before the regex runs
+    is_station = (len(text_upper) >= 4 and text_upper[-1] == ')' and '(' in text_upper
+                  and _STATION_RE.match(text_upper) is not None)
+    logger.debug("🚉 STATION DETECTION: '%s' -> Upper: '%s', Is Station: %s", text, text_upper, is_station)
     
     # Check if text is near center (increased threshold for stations)
     distance_from_center = abs(text_center_x - page_center_x)
@@ -154,8 +275,16 @@ def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, p
     is_left_positioned = x0 < (page_width / 3)
     
     # Check if text appears to be in a column structure
-    same_line_items = [item for item in all_text_items 
-                      if abs(item['y'] - y0) < 5 and item['text'].strip()]
+    if line_index is not None:
+        # |y - y0| < tolerance can only fall in y0's bucket or one of its neighbours
+        bucket = int(y0 // SAME_LINE_TOLERANCE)
+        candidates = [item for b in (bucket - 1, bucket, bucket + 1) for item in line_index.get(b, ())]
+    else:
+        candidates = all_text_items
+    # The edited span itself is not one of its neighbours
+    same_line_items = [item for item in candidates
+                      if abs(item['y'] - y0) < SAME_LINE_TOLERANCE and item['text'].strip()
+                      and not (item['x'] == x0 and item['y'] == y0)]
     
     is_tabular = len(same_line_items) > 2
     
@@ -201,13 +330,17 @@ def get_smart_alignment(text: str, old_text: str, line_text: str, bbox: tuple, p
             'new_bbox': [x0, y0, x0 + new_width, y1]
         }
 
-app = FastAPI(title="PDF Editor Backend - Advanced")
+# orjson encodes the large, float-heavy metadata payloads far faster than the stdlib encoder
+app = FastAPI(title="PDF Editor Backend - Advanced", default_response_class=ORJSONResponse)
+
+# Per-span/edit progress is logged at DEBUG; set LOG_LEVEL=DEBUG to see it
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 
 # Get the frontend URL from environment variable (for Vercel)
 frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
 # Add CORS middleware with FULL Vercel compatibility
-print(f"🌐 Configured CORS for frontend: {frontend_url}")
+logger.info("🌐 Configured CORS for frontend: %s", frontend_url)
 
 app.add_middleware(
     CORSMiddleware,
@@ -250,6 +383,8 @@ app.add_middleware(
         "Access-Control-Request-Headers",
         "*"
     ],
+    # /edit-binary returns its edit details in this header; browsers hide it from scripts unless exposed
+    expose_headers=["X-Edit-Meta"],
 )
 
 # Add explicit CORS preflight handler for maximum compatibility
@@ -280,18 +415,107 @@ async def add_cors_headers(request: Request, call_next):
     response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, HEAD, PATCH"
     response.headers["Access-Control-Allow-Headers"] = "*"
     response.headers["Access-Control-Max-Age"] = "86400"
+    response.headers["Access-Control-Expose-Headers"] = "X-Edit-Meta"
     
     return response
 
-class EditRequest(BaseModel):
+class BatchEditItem(BaseModel):
     page: int
     metadata_key: str
     new_text: str
-    pdf_data: str  # Base64 encoded PDF data
-    text_metadata: Dict[str, Any]
 
-class DownloadRequest(BaseModel):
-    pdf_data: str  # Base64 encoded PDF data
+class EditRequest(BatchEditItem):
+    text_metadata: Optional[Dict[str, Any]] = None  # Only needed if the server lost its cached copy
+
+class BatchEditRequest(BaseModel):
+    edits: List[BatchEditItem]
+    continue_on_error: bool = True  # Skip edits that fail instead of rejecting the whole batch
+    text_metadata: Optional[Dict[str, Any]] = None  # Only needed if the server lost its cached copy
+
+# Server-side text metadata and latest PDF version keyed by file_id, so edits only send the metadata_key
+MAX_CACHED_FILES = 32
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_CHUNK_SIZE = 1 << 20
+B64_CHUNK_SIZE = 3 * (1 << 18)  # multiple of 3, so chunked base64 concatenates cleanly
+_METADATA_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+# Each PDF version is a file on disk; MuPDF opens it by path instead of from an in-memory copy
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "pdf-editor")
+os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+_PDF_PATHS: "OrderedDict[str, str]" = OrderedDict()
+# page number -> metadata keys on that page, so per-page lookups don't scan every span
+_PAGE_INDEX_CACHE: "OrderedDict[str, Dict[int, List[str]]]" = OrderedDict()
+# Sync routes run in Starlette's threadpool, so cache bookkeeping must be serialized
+_CACHE_LOCK = threading.Lock()
+
+def _cache_put(cache: OrderedDict, file_id: str, value: Any) -> List[Any]:
+    """Store a value for file_id, evicting the least recently used file when full; returns the displaced values"""
+    with _CACHE_LOCK:
+        displaced = [cache[file_id]] if file_id in cache else []
+        cache[file_id] = value
+        cache.move_to_end(file_id)
+        while len(cache) > MAX_CACHED_FILES:
+            displaced.append(cache.popitem(last=False)[1])
+        return displaced
+
+def _cache_get(cache: OrderedDict, file_id: str) -> Any:
+    """Fetch the cached value for file_id (None if missing) and mark it recently used"""
+    with _CACHE_LOCK:
+        value = cache.get(file_id)
+        if value is not None:
+            cache.move_to_end(file_id)
+        return value
+
+# Striped locks: edits to the same file run one at a time (each starts from the previous result),
+# edits to different files almost always land on different stripes and proceed in parallel
+_EDIT_LOCK_STRIPES = 64
+_EDIT_LOCKS = tuple(threading.Lock() for _ in range(_EDIT_LOCK_STRIPES))
+
+def _edit_lock(file_id: str) -> threading.Lock:
+    """Lock serializing edits to file_id"""
+    return _EDIT_LOCKS[hash(file_id) % _EDIT_LOCK_STRIPES]
+
+def _build_page_index(text_metadata: Dict[str, Any]) -> Dict[int, List[str]]:
+    """Group metadata keys by page number in one pass"""
+    page_index: Dict[int, List[str]] = {}
+    for key, item in text_metadata.items():
+        page_index.setdefault(item.get("page"), []).append(key)
+    return page_index
+
+def _page_items(file_id: str, text_metadata: Dict[str, Any], page_num: int) -> Dict[str, Any]:
+    """Metadata entries on one page, via the cached page index when there is one"""
+    page_index = _cache_get(_PAGE_INDEX_CACHE, file_id)
+    if page_index is None:
+        page_index = _build_page_index(text_metadata)
+    return {key: text_metadata[key] for key in page_index.get(page_num, ()) if key in text_metadata}
+
+def _remove_file(path: str) -> None:
+    """Delete a file, ignoring one that is already gone"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _new_pdf_path(file_id: str) -> str:
+    """Fresh, uniquely named file for the next version of file_id"""
+    fd, path = tempfile.mkstemp(prefix=f"{file_id}.", suffix=".pdf", dir=PDF_CACHE_DIR)
+    os.close(fd)
+    return path
+
+def _set_pdf_path(file_id: str, path: str) -> None:
+    """Make path the latest version of file_id and delete the versions it replaces or evicts"""
+    for old_path in _cache_put(_PDF_PATHS, file_id, path):
+        if old_path != path:
+            _remove_file(old_path)
+
+def _iter_pdf_chunks(pdf_file: BinaryIO):
+    """Yield an open PDF file in fixed-size chunks for StreamingResponse, closing it at the end"""
+    with pdf_file:
+        while chunk := pdf_file.read(DOWNLOAD_CHUNK_SIZE):
+            yield chunk
+
+def _b64encode_file(pdf_file: BinaryIO) -> str:
+    """Base64-encode an open file without holding its raw bytes in memory all at once"""
+    return "".join(base64.b64encode(chunk).decode('ascii') for chunk in iter(lambda: pdf_file.read(B64_CHUNK_SIZE), b""))
 
 @app.get("/")
 async def root():
@@ -321,44 +545,33 @@ async def root():
 @app.post("/upload-pdf")
 async def upload_pdf(file: UploadFile = File(...)):
     """ADVANCED PDF processing with enhanced metadata extraction and visual boldness analysis"""
+    file_id = pdf_path = None
     try:
-        print("🚀 ADVANCED PDF PROCESSING: Starting upload with enhanced metadata extraction")
+        logger.debug("🚀 ADVANCED PDF PROCESSING: Starting upload with enhanced metadata extraction")
         
         if not file.filename.lower().endswith('.pdf'):
             return {"success": False, "error": "Only PDF files are allowed", "filename": file.filename}
         
-        file_content = await file.read()
         file_id = str(uuid.uuid4())
         
-        print(f"📄 Processing PDF: {len(file_content)} bytes, ID: {file_id}")
+        # Stream the upload straight to disk in 1 MiB chunks instead of buffering it in memory
+        pdf_path = _new_pdf_path(file_id)
+        with open(pdf_path, "wb") as dst:
+            await run_in_threadpool(shutil.copyfileobj, file.file, dst, UPLOAD_CHUNK_SIZE)
+        
+        logger.debug("📄 Processing PDF: %s bytes, ID: %s", os.path.getsize(pdf_path), file_id)
         
         # Skip embedded font extraction - using PyMuPDF-only approach
         embedded_fonts = {}
-        print(f"⚠️ Font extraction warning: Using PyMuPDF-only approach")
+        logger.warning("⚠️ Font extraction warning: Using PyMuPDF-only approach")
         
         # STEP 2: Use ENHANCED metadata extraction with visual boldness analysis
-        print("🔍 STARTING ENHANCED METADATA EXTRACTION...")
+        logger.debug("🔍 STARTING ENHANCED METADATA EXTRACTION...")
         
         try:
-            # Extract text metadata from ALL pages
-            all_metadata = []
-            
-            # Open PDF to get page count
-            doc = fitz.open(stream=file_content, filetype="pdf")
-            total_pages = len(doc)
-            doc.close()
-            
-            print(f"📄 Processing {total_pages} pages...")
-            
-            # Extract metadata from each page
-            for page_idx in range(total_pages):
-                print(f"🔍 Processing page {page_idx + 1}/{total_pages}...")
-                # Use PyMuPDF-only metadata extraction
-                page_metadata = extract_pymupdf_metadata(file_content, page_num=page_idx)
-                if page_metadata:
-                    # page_metadata is a dict, convert to list of metadata items
-                    for key, metadata in page_metadata.items():
-                        all_metadata.append(metadata)
+            # Extract text metadata from ALL pages in one pass (PDF is opened once)
+            # Off the event loop: other requests keep being served while this PDF is parsed
+            all_metadata = await run_in_threadpool(extract_pymupdf_metadata, pdf_path)
             
             if not all_metadata:
                 raise Exception("Enhanced extraction returned empty results")
@@ -366,194 +579,182 @@ async def upload_pdf(file: UploadFile = File(...)):
             text_items = []
             text_metadata = {}
             
-            print(f"📊 ENHANCED EXTRACTION: Found {len(all_metadata)} text items with full metadata")
+            logger.debug("📊 ENHANCED EXTRACTION: Found %s text items with full metadata", len(all_metadata))
             
-            for i, metadata in enumerate(all_metadata):
-                metadata_key = f"text_item_{i+1}"
+            # Keys are content hashes, so they stay the same however the pages were processed
+            for metadata_key, metadata in all_metadata.items():
+                # Each field is read once and shared by the display item and the editing metadata
+                text, bbox, page_no = metadata["text"], metadata["bbox"], metadata["page"]
+                font, size, flags = metadata["clean_font_name"], metadata["font_size"], metadata["flags"]
+                is_bold, is_italic = metadata["is_bold"], metadata["is_italic"]
+                color, visual_boldness = metadata["color_int"], metadata["visual_boldness_score"]
                 
                 # Create text item for frontend display
-                text_item = {
-                    "text": metadata["text"],
-                    "page": metadata["page"],  # Use actual page number from metadata
-                    "x": metadata["bbox"][0],
-                    "y": metadata["bbox"][1],
-                    "width": metadata["bbox"][2] - metadata["bbox"][0],  # Calculate width from bbox
-                    "height": metadata["bbox"][3] - metadata["bbox"][1],  # Calculate height from bbox
-                    "font": metadata["clean_font_name"],
-                    "size": metadata["font_size"],
+                text_items.append({
+                    "text": text,
+                    "page": page_no,  # Use actual page number from metadata
+                    "x": bbox[0],
+                    "y": bbox[1],
+                    "width": bbox[2] - bbox[0],  # Calculate width from bbox
+                    "height": bbox[3] - bbox[1],  # Calculate height from bbox
+                    "font": font,
+                    "size": size,
                     "metadata_key": metadata_key,
-                    "color": metadata["color_int"],
-                    "flags": metadata["flags"],
-                    "is_bold": metadata["is_bold"],
-                    "is_italic": metadata["is_italic"],
-                    "visual_boldness": metadata["visual_boldness_score"]
-                }
+                    "color": color,
+                    "flags": flags,
+                    "is_bold": is_bold,
+                    "is_italic": is_italic,
+                    "visual_boldness": visual_boldness
+                })
                 
                 # Store COMPREHENSIVE metadata for editing
                 text_metadata[metadata_key] = {
                     # Basic text properties
-                    "text": metadata["text"],
-                    "bbox": metadata["bbox"],
-                    "page": metadata["page"],
+                    "text": text,
+                    "bbox": bbox,
+                    "page": page_no,
                     
                     # Font properties
-                    "font": metadata["clean_font_name"],
-                    "size": metadata["font_size"],
-                    "flags": metadata["flags"],
+                    "font": font,
+                    "size": size,
+                    "flags": flags,
                     
                     # Enhanced boldness detection
-                    "is_bold": metadata["is_bold"],
-                    "visual_boldness_score": metadata["visual_boldness_score"],
+                    "is_bold": is_bold,
+                    "visual_boldness_score": visual_boldness,
                     
                     # Style properties  
-                    "is_italic": metadata["is_italic"],
+                    "is_italic": is_italic,
                     
                     # Color and rendering
-                    "color": metadata["color_int"],
-                    "color_rgb": [int(c*255) for c in metadata["color"]],  # Convert back to RGB 0-255
+                    "color": color,
+                    "color_rgb": metadata["color_rgb"],  # RGB 0-255, unpacked straight from the color int
                     
                     # Spacing and positioning (using defaults for now)
                     "char_spacing": 0.0,
                     "word_spacing": 0.0
                 }
-                
-                text_items.append(text_item)
         
         except Exception as extraction_error:
-            print(f"❌ Enhanced extraction failed: {extraction_error}")
-            print("🔄 Falling back to basic PyMuPDF extraction...")
+            logger.error("❌ Enhanced extraction failed: %s", extraction_error)
+            logger.debug("🔄 Falling back to basic PyMuPDF extraction...")
+            
+            # Fallback to basic extraction: spans flattened once, arithmetic done column-wise
+            pdf_document = fitz.open(pdf_path)
+            try:
+                spans = [
+                    (page_num + 1, span)
+                    for page_num in range(len(pdf_document))
+                    for block in pdf_document[page_num].get_text("dict", flags=TEXT_FLAGS)["blocks"] if "lines" in block
+                    for line in block["lines"]
+                    for span in line["spans"] if span["text"].strip()
+                ]
+            finally:
+                pdf_document.close()
             
-            # Fallback to basic extraction
-            pdf_document = fitz.open(stream=file_content, filetype="pdf")
             text_items = []
             text_metadata = {}
-            item_counter = 0
             
-            for page_num in range(len(pdf_document)):
-                page = pdf_document[page_num]
-                text_dict = page.get_text("dict", flags=11)
+            if spans:
+                bbox_arr = np.asarray([span["bbox"] for _, span in spans], dtype=np.float64)
+                flags_arr = np.asarray([span["flags"] for _, span in spans], dtype=np.int64)
+                widths = (bbox_arr[:, 2] - bbox_arr[:, 0]).tolist()
+                heights = (bbox_arr[:, 3] - bbox_arr[:, 1]).tolist()
+                is_bold_arr = ((flags_arr & 16) != 0).tolist()
+                is_italic_arr = ((flags_arr & 2) != 0).tolist()
                 
-                for block in text_dict["blocks"]:
-                    if "lines" in block:
-                        for line in block["lines"]:
-                            for span in line["spans"]:
-                                if span["text"].strip():
-                                    item_counter += 1
-                                    metadata_key = f"text_item_{item_counter}"
-                                    
-                                    font_info = span["font"]
-                                    font_size = span["size"]
-                                    font_flags = span["flags"]
-                                    text_color = span["color"]
-                                    bbox = span["bbox"]
-                                    
-                                    is_bold = bool(font_flags & 16)
-                                    is_italic = bool(font_flags & 2)
-                                    
-                                    text_item = {
-                                        "text": span["text"],
-                                        "page": page_num + 1,
-                                        "x": bbox[0],
-                                        "y": bbox[1],
-                                        "width": bbox[2] - bbox[0],
-                                        "height": bbox[3] - bbox[1],
-                                        "font": font_info,
-                                        "size": font_size,
-                                        "metadata_key": metadata_key,
-                                        "color": text_color,
-                                        "flags": font_flags,
-                                        "is_bold": is_bold,
-                                        "is_italic": is_italic,
-                                        "visual_boldness": 0.0
-                                    }
-                                    
-                                    text_metadata[metadata_key] = {
-                                        "text": span["text"],
-                                        "bbox": list(bbox),
-                                        "font": font_info,
-                                        "size": font_size,
-                                        "color": text_color,
-                                        "flags": font_flags,
-                                        "page": page_num + 1,
-                                        "is_bold": is_bold,
-                                        "is_italic": is_italic
-                                    }
-                                    
-                                    text_items.append(text_item)
-                                    print(f"📝 BASIC: '{span['text'][:20]}' -> Font: {font_info}, Size: {font_size}, Bold: {is_bold}")
+                for (page_no, span), width, height, is_bold, is_italic in zip(spans, widths, heights, is_bold_arr, is_italic_arr):
+                    bbox = span["bbox"]
+                    metadata_key = _span_key(page_no, bbox, span["text"])
+                    if metadata_key in text_metadata:
+                        metadata_key = f"{metadata_key}_{len(text_metadata)}"
+                    
+                    text_items.append({
+                        "text": span["text"],
+                        "page": page_no,
+                        "x": bbox[0],
+                        "y": bbox[1],
+                        "width": width,
+                        "height": height,
+                        "font": span["font"],
+                        "size": span["size"],
+                        "metadata_key": metadata_key,
+                        "color": span["color"],
+                        "flags": span["flags"],
+                        "is_bold": is_bold,
+                        "is_italic": is_italic,
+                        "visual_boldness": 0.0
+                    })
+                    
+                    text_metadata[metadata_key] = {
+                        "text": span["text"],
+                        "bbox": list(bbox),
+                        "font": span["font"],
+                        "size": span["size"],
+                        "color": span["color"],
+                        "flags": span["flags"],
+                        "page": page_no,
+                        "is_bold": is_bold,
+                        "is_italic": is_italic
+                    }
             
-            pdf_document.close()
-            print(f"✅ FALLBACK extraction complete: {len(text_items)} items")
+            logger.debug("✅ FALLBACK extraction complete: %s items", len(text_items))
         
-        # Encode original PDF as base64 for frontend storage
-        pdf_data_base64 = base64.b64encode(file_content).decode('utf-8')
+        # Keep metadata server-side so edits don't have to send it back
+        _cache_put(_METADATA_CACHE, file_id, text_metadata)
+        _set_pdf_path(file_id, pdf_path)
+        _cache_put(_PAGE_INDEX_CACHE, file_id, _build_page_index(text_metadata))
         
+        # Neither the PDF nor the full metadata is echoed back: GET /pdf/{file_id}/raw serves the PDF as binary,
+        # and GET /pdf/{file_id}/meta/{metadata_key} serves one item's editing metadata on demand
         response = {
             "success": True,
             "fileId": file_id,
             "filename": file.filename,
             "textItems": text_items,
-            "pdfData": pdf_data_base64,
-            "textMetadata": text_metadata,
             "backendVersion": "ADVANCED_ENHANCED_METADATA_V4",
             "extractedItems": len(text_items),
             "embeddedFonts": len(embedded_fonts)
         }
         
-        print(f"✅ ADVANCED PDF processing complete: {len(text_items)} text items, {len(embedded_fonts)} embedded fonts")
-        return response
+        logger.info("✅ ADVANCED PDF processing complete: %s text items, %s embedded fonts", len(text_items), len(embedded_fonts))
+        # Returned as a response object so FastAPI skips its jsonable_encoder walk over every item
+        return ORJSONResponse(response)
         
     except Exception as e:
-        print(f"❌ ADVANCED PDF ERROR: {e}")
+        logger.error("❌ ADVANCED PDF ERROR: %s", e)
+        # Don't leave an unregistered upload behind on disk
+        if pdf_path is not None and _cache_get(_PDF_PATHS, file_id) != pdf_path:
+            _remove_file(pdf_path)
         return {"success": False, "error": str(e), "filename": file.filename if file else "unknown"}
 
+# One compiled scan finds every family keyword in a font name; Calibri/Arial map to Helvetica
+_FONT_FAMILY_RE = re.compile(r"(?P<helv>calibri|arial|helvetica)|(?P<times>times|roman)|(?P<cour>courier|mono)")
+_FAMILY_PRIORITY = ("helv", "times", "cour")
+
+# (family, is_bold, is_italic) -> Base-14 font; bold italic uses the bold face, Courier has no italic here
+_BASE14_VARIANTS = MappingProxyType({
+    ("helv", False, False): "helv",
+    ("helv", True, False): "hebo",
+    ("helv", False, True): "heit",
+    ("helv", True, True): "hebo",
+    ("times", False, False): "tiro",
+    ("times", True, False): "tibo",
+    ("times", False, True): "tiit",
+    ("times", True, True): "tibo",
+    ("cour", False, False): "cour",
+    ("cour", True, False): "cobo",
+    ("cour", False, True): "cour",
+    ("cour", True, True): "cobo",
+})
+
+@lru_cache(maxsize=1024)
 def map_to_pymupdf_font(font_name: str, is_bold: bool, is_italic: bool) -> str:
-    """Map font names to PyMuPDF fonts with enhanced precision and better matching"""
-    font_lower = font_name.lower()
-    
-    # Enhanced font mapping with better fallbacks
-    if any(name in font_lower for name in ['calibri']):
-        # Calibri is very common in modern PDFs
-        if is_bold and is_italic:
-            return "hebo"  # Helvetica Bold as best substitute
-        elif is_bold:
-            return "hebo"  # Helvetica Bold
-        elif is_italic:
-            return "heit"  # Helvetica Italic
-        else:
-            return "helv"  # Regular Helvetica (closest to Calibri)
-    elif any(name in font_lower for name in ['arial', 'helvetica']):
-        if is_bold and is_italic:
-            return "hebo"  # Use bold as primary
-        elif is_bold:
-            return "hebo"  # Helvetica Bold
-        elif is_italic:
-            return "heit"  # Helvetica Italic
-        else:
-            return "helv"  # Regular Helvetica
-    elif any(name in font_lower for name in ['times', 'roman']):
-        if is_bold and is_italic:
-            return "tibo"  # Use bold as primary
-        elif is_bold:
-            return "tibo"  # Times Bold
-        elif is_italic:
-            return "tiit"  # Times Italic
-        else:
-            return "tiro"  # Times Roman
-    elif any(name in font_lower for name in ['courier', 'mono']):
-        if is_bold:
-            return "cobo"  # Courier Bold
-        else:
-            return "cour"  # Regular Courier
-    else:
-        # Default mapping with better font selection
-        if is_bold:
-            return "hebo"  # Default to Helvetica Bold
-        elif is_italic:
-            return "heit"  # Default to Helvetica Italic
-        else:
-            return "helv"  # Default to Helvetica
-            return "helv"  # Default to Helvetica
+    """Map font names to PyMuPDF fonts with enhanced precision and better matching (memoized - documents reuse few fonts)"""
+    families = {match.lastgroup for match in _FONT_FAMILY_RE.finditer(font_name.lower())}
+    # Unknown families default to Helvetica
+    family = next((f for f in _FAMILY_PRIORITY if f in families), "helv")
+    return _BASE14_VARIANTS[(family, bool(is_bold), bool(is_italic))]
 
 @app.post("/analyze-pdf")
 async def analyze_pdf_boldness(file: UploadFile = File(...)):
@@ -564,17 +765,23 @@ async def analyze_pdf_boldness(file: UploadFile = File(...)):
         
         file_content = await file.read()
         
+        # Imported here so the editing endpoints don't load the visual-analysis module
+        from enhanced_metadata import analyze_text_differences, to_columns
+        
         # Run comprehensive analysis
-        metadata_list = analyze_text_differences(file_content, page_num=0)
+        metadata_list = await run_in_threadpool(analyze_text_differences, file_content, page_num=0)
         
-        # Summary statistics
-        total_items = len(metadata_list)
-        bold_flag_count = sum(1 for item in metadata_list if item['is_bold_flag'])
-        bold_name_count = sum(1 for item in metadata_list if item['is_bold_name'])
-        bold_final_count = sum(1 for item in metadata_list if item['is_bold_final'])
-        high_visual_bold_count = sum(1 for item in metadata_list if item['visual_boldness_score'] > 2.0)
+        # Summary statistics, one vectorized pass per count
+        columns = to_columns(metadata_list)
+        bold_by_flag = (columns.flags & 16) != 0
+        total_items = len(columns)
+        bold_flag_count = int(np.count_nonzero(bold_by_flag))
+        bold_name_count = int(np.count_nonzero(columns.bold_names))
+        bold_final_count = int(np.count_nonzero(bold_by_flag | columns.bold_names))
+        high_visual_bold_count = int(np.count_nonzero(columns.visual_boldness > 2.0))
         
-        return {
+        # ORJSONResponse serializes NumPy arrays natively, so the scores go out without .tolist()
+        return ORJSONResponse({
             "success": True,
             "total_text_items": total_items,
             "bold_detection_summary": {
@@ -584,327 +791,488 @@ async def analyze_pdf_boldness(file: UploadFile = File(...)):
                 "high_visual_boldness": high_visual_bold_count
             },
             "detailed_analysis": metadata_list[:20],  # First 20 items for debugging
-            "visual_boldness_scores": [item['visual_boldness_score'] for item in metadata_list]
-        }
+            "visual_boldness_scores": columns.visual_boldness
+        })
     
     except Exception as e:
-        print(f"❌ Analysis failed: {str(e)}")
+        logger.error("❌ Analysis failed: %s", e)
         return {"success": False, "error": str(e)}
 
-@app.post("/pdf/{file_id}/edit")
-async def edit_text(file_id: str, edit_request: EditRequest):
-    """ADVANCED PDF text editing using precise font matching and perfect positioning"""
+def _load_edit_source(file_id: str, fallback_metadata: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """Path of the latest PDF version and the text metadata for file_id, falling back to the client's metadata"""
+    # Prefer the server-side metadata cached at upload; fall back to the client's copy
+    text_metadata = _cache_get(_METADATA_CACHE, file_id)
+    if text_metadata is None:
+        logger.warning("⚠️ No cached metadata for %s, using request payload", file_id)
+        text_metadata = fallback_metadata or {}
+    
+    # Start from the latest stored version
+    pdf_path = _cache_get(_PDF_PATHS, file_id)
+    if pdf_path is None:
+        raise HTTPException(status_code=404, detail="PDF not found, please upload it again")
+    
+    return pdf_path, text_metadata
+
+def _plan_edit(file_id: str, text_metadata: Dict[str, Any], edit_request: BatchEditItem, page_width: float) -> Dict[str, Any]:
+    """Work out where and how the replacement text is drawn, without touching the document"""
+    # Get the specific text metadata
+    if edit_request.metadata_key not in text_metadata:
+        logger.error("❌ Metadata key not found: %s", edit_request.metadata_key)
+        logger.debug("🔍 Available keys: %s", len(text_metadata))
+        raise HTTPException(status_code=400, detail="Text metadata not found")
+    
+    metadata = text_metadata[edit_request.metadata_key]
+    logger.debug("🔍 EDIT DEBUG: Found metadata for %s", edit_request.metadata_key)
+    logger.debug("🔍 EDIT DEBUG: metadata keys = %s", list(metadata.keys()) if metadata else 'None')
+    if 'color_rgb' in metadata:
+        logger.debug("🔍 EDIT DEBUG: color_rgb = %s", metadata['color_rgb'])
+    new_text = edit_request.new_text
+    
+    # Extract enhanced metadata with precise font matching
+    original_bbox = metadata["bbox"]
+    font_name = metadata["font"]
+    raw_font_size = metadata["size"]
+    # Use exact font size from original text, not rounded
+    font_size = float(raw_font_size)  # Preserve decimal precision
+    is_bold = metadata.get("is_bold_final", False)
+    is_italic = metadata.get("is_italic", False)
+    visual_boldness = metadata.get("visual_boldness_score", 0.0)
+    original_text = metadata["text"]
+    
+    logger.debug("🎯 EDITING: '%s' -> '%s'", original_text, new_text)
+    logger.debug("📏 Original Position: %s, Font: %s, Size: %s", original_bbox, font_name, font_size)
+    logger.debug("🎨 Style: Bold=%s, Italic=%s, Visual Boldness=%s", is_bold, is_italic, visual_boldness)
+    
+    # 🧠 INTELLIGENT POSITIONING: Simple context analysis using PyMuPDF
+    logger.debug("🧠 ANALYZING TEXT CONTEXT...")
     try:
-        print(f"🚀 ADVANCED EDITING: Starting text edit for file_id: {file_id}")
-        print(f"📝 Edit request - page: {edit_request.page}, metadata_key: {edit_request.metadata_key}")
-        print(f"🔍 EDIT DEBUG: text_metadata type = {type(edit_request.text_metadata)}")
-        print(f"🔍 EDIT DEBUG: text_metadata keys = {list(edit_request.text_metadata.keys()) if edit_request.text_metadata else 'None'}")
-        
-        # Decode PDF data from request
-        try:
-            pdf_content = base64.b64decode(edit_request.pdf_data)
-        except Exception as e:
-            print(f"❌ Failed to decode PDF data: {str(e)}")
-            raise HTTPException(status_code=400, detail="Invalid PDF data")
-        
-        # Get the specific text metadata
-        if edit_request.metadata_key not in edit_request.text_metadata:
-            print(f"❌ Metadata key not found: {edit_request.metadata_key}")
-            print(f"🔍 Available keys: {list(edit_request.text_metadata.keys())}")
-            raise HTTPException(status_code=400, detail="Text metadata not found")
-        
-        metadata = edit_request.text_metadata[edit_request.metadata_key]
-        print(f"🔍 EDIT DEBUG: Found metadata for {edit_request.metadata_key}")
-        print(f"🔍 EDIT DEBUG: metadata keys = {list(metadata.keys()) if metadata else 'None'}")
-        if 'color_rgb' in metadata:
-            print(f"🔍 EDIT DEBUG: color_rgb = {metadata['color_rgb']}")
-        new_text = edit_request.new_text
-        
-        # Open with PyMuPDF for text manipulation
-        pymupdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
-        pymupdf_page = pymupdf_doc[edit_request.page - 1]
-        
-        # Extract enhanced metadata with precise font matching
-        original_bbox = metadata["bbox"]
-        font_name = metadata["font"]
-        raw_font_size = metadata["size"]
-        # Use exact font size from original text, not rounded
-        font_size = float(raw_font_size)  # Preserve decimal precision
-        is_bold = metadata.get("is_bold_final", False)
-        is_italic = metadata.get("is_italic", False)
-        visual_boldness = metadata.get("visual_boldness_score", 0.0)
-        original_text = metadata["text"]
-        
-        print(f"🎯 EDITING: '{original_text}' -> '{new_text}'")
-        print(f"📏 Original Position: {original_bbox}, Font: {font_name}, Size: {font_size}")
-        print(f"🎨 Style: Bold={is_bold}, Italic={is_italic}, Visual Boldness={visual_boldness}")
-        
-        # 🧠 INTELLIGENT POSITIONING: Simple context analysis using PyMuPDF
-        print(f"🧠 ANALYZING TEXT CONTEXT...")
-        try:
-            # Get page width first
-            page_width = pymupdf_page.rect.width
-            
-            # Get page context for intelligent positioning
-            page_metadata = extract_pymupdf_metadata(pdf_content, page_num=edit_request.page - 1)
-            all_text_items = list(page_metadata.values())
-            
-            # Simple context analysis
-            text_context = {
-                'alignment': 'center' if abs((original_bbox[0] + original_bbox[2])/2 - page_width/2) < page_width * 0.15 else 'left',
-                'is_near_center': abs((original_bbox[0] + original_bbox[2])/2 - page_width/2) < page_width * 0.15,
-                'is_list_item': False,  # Added missing variable
-                'is_header': False,     # Added missing variable  
-                'is_justified': False,  # Added missing variable
-                'spacing_analysis': {'has_adequate_space': True},
-                'context_items': len(all_text_items)
-            }
-            
-            print(f"📊 CONTEXT ANALYSIS:")
-            print(f"   Alignment: {text_context['alignment']}")
-            print(f"   List Item: {text_context['is_list_item']}")
-            print(f"   Header: {text_context['is_header']}")
-            print(f"   Justified: {text_context['is_justified']}")
-            
-            # USE NEW SMART ALIGNMENT SYSTEM
-            # Get all text items for context (simplified for now)
-            all_text_items = [{'x': original_bbox[0], 'y': original_bbox[1], 'text': original_text}]
-            
-            smart_alignment = get_smart_alignment(
-                text=new_text,
-                old_text=original_text, 
-                line_text=original_text,  # Using original text as line text for now
-                bbox=original_bbox,
-                page_width=page_width,
-                all_text_items=all_text_items
-            )
-            
-            print(f"🎯 SMART ALIGNMENT STRATEGY: {smart_alignment['strategy']}")
-            print(f"📘 REASONING: {smart_alignment['reasoning']}")
-            print(f"📏 New Position: {smart_alignment['new_bbox']}")
-            
-            # Use the smart alignment result
-            new_bbox = smart_alignment['new_bbox']
-            positioning_strategy = smart_alignment['strategy']
-            
-        except Exception as e:
-            print(f"⚠️  Intelligent positioning failed: {e}")
-            print(f"🔄 Falling back to original position")
-            new_bbox = original_bbox
-            positioning_strategy = "fallback"
-            # Initialize smart_alignment for fallback case
-            smart_alignment = {
-                'strategy': 'fallback',
-                'reasoning': 'Error in intelligent positioning',
-                'new_bbox': original_bbox
-            }
-        
-        # Determine effective font weight based on multiple factors
-        # High visual boldness score or explicit bold flag should result in bold text
-        effective_bold = is_bold or (visual_boldness > 50.0)
-        
-        print(f"🔍 BOLDNESS ANALYSIS:")
-        print(f"   Flag Bold: {is_bold}")
-        print(f"   Visual Boldness Score: {visual_boldness}")
-        print(f"   Effective Bold: {effective_bold}")
-        
-        # Map font to PyMuPDF font with proper boldness
-        pymupdf_font = map_to_pymupdf_font(font_name, effective_bold, is_italic)
-        
-        # Get original color and spacing from metadata
-        original_color_rgb = metadata.get("color_rgb", (0, 0, 0))  # Default to black if not found
-        original_color_normalized = tuple(c/255.0 for c in original_color_rgb)  # PyMuPDF uses 0-1 range
-        
-        # Extract spacing information for better text rendering
-        char_spacing = metadata.get("char_spacing", 0.0)
-        word_spacing = metadata.get("word_spacing", 0.0)
-        
-        print(f"🎨 Using original color: RGB{original_color_rgb} -> Normalized{original_color_normalized}")
-        print(f"📏 Character spacing: {char_spacing}, Word spacing: {word_spacing}")
-        
-        # INTELLIGENT POSITIONING ANALYSIS - Using Smart Alignment
-        print(f"🔍 USING SMART ALIGNMENT (already calculated above)")
+        # Page context comes from the metadata extracted at upload, not a fresh parse of the PDF
+        all_text_items = list(_page_items(file_id, text_metadata, edit_request.page).values())
+    
+        # Simple context analysis
+        text_context = {
+            'alignment': 'center' if abs((original_bbox[0] + original_bbox[2])/2 - page_width/2) < page_width * 0.15 else 'left',
+            'is_near_center': abs((original_bbox[0] + original_bbox[2])/2 - page_width/2) < page_width * 0.15,
+            'is_list_item': False,  # Added missing variable
+            'is_header': False,     # Added missing variable  
+            'is_justified': False,  # Added missing variable
+            'spacing_analysis': {'has_adequate_space': True},
+            'context_items': len(all_text_items)
+        }
+    
+        logger.debug("📊 CONTEXT ANALYSIS:")
+        logger.debug("   Alignment: %s", text_context['alignment'])
+        logger.debug("   List Item: %s", text_context['is_list_item'])
+        logger.debug("   Header: %s", text_context['is_header'])
+        logger.debug("   Justified: %s", text_context['is_justified'])
+    
+        # USE NEW SMART ALIGNMENT SYSTEM
+        # Get all text items for context (simplified for now)
+        all_text_items = [{'x': original_bbox[0], 'y': original_bbox[1], 'text': original_text}]
+    
+        smart_alignment = get_smart_alignment(
+            text=new_text,
+            old_text=original_text, 
+            line_text=original_text,  # Using original text as line text for now
+            bbox=original_bbox,
+            page_width=page_width,
+            all_text_items=all_text_items
+        )
+    
+        logger.debug("🎯 SMART ALIGNMENT STRATEGY: %s", smart_alignment['strategy'])
+        logger.debug("📘 REASONING: %s", smart_alignment['reasoning'])
+        logger.debug("📏 New Position: %s", smart_alignment['new_bbox'])
+    
+        # Use the smart alignment result
+        new_bbox = smart_alignment['new_bbox']
         positioning_strategy = smart_alignment['strategy']
-        
-        # Create rectangle for the original text (to clear)
-        original_text_rect = fitz.Rect(original_bbox)
-        
-        # Clear the original text by drawing a white rectangle
-        pymupdf_page.draw_rect(original_text_rect, color=None, fill=fitz.utils.getColor("white"))
-        
-        # Use the intelligently calculated position for new text with baseline adjustment
-        text_baseline_y = new_bbox[3] - (font_size * 0.2)  # Adjust for font baseline
-        text_point = fitz.Point(new_bbox[0], text_baseline_y)
-        
-        print(f"📍 ENHANCED TEXT PLACEMENT:")
-        print(f"   Original bbox: {original_bbox}")
-        print(f"   New bbox: {new_bbox}")
-        print(f"   Text point: ({text_point.x:.2f}, {text_point.y:.2f})")
-        print(f"   Baseline adjusted Y: {text_baseline_y:.2f}")
-        print(f"   Font size: {font_size}")
-        print(f"   Strategy: {positioning_strategy}")
-        print(f"   Spacing: char={char_spacing:.1f}, word={word_spacing:.1f}")
-        
-        # Determine render mode based on boldness intensity
-        # For very high visual boldness, use stroke rendering for extra boldness
-        render_mode = 0  # Default: fill text
-        stroke_width = 0.0
-        
-        if visual_boldness > 80.0:  # Very bold text
-            render_mode = 2  # Fill and stroke for extra boldness
-            stroke_width = 0.2
-        elif effective_bold:
-            render_mode = 0  # Just use bold font
-        
-        try:
-            if render_mode == 2:  # Enhanced boldness with stroke
-                pymupdf_page.insert_text(
-                    text_point,
-                    new_text,
-                    fontname=pymupdf_font,
-                    fontsize=font_size,
-                    color=original_color_normalized,
-                    render_mode=render_mode,
-                    stroke_width=stroke_width
-                )
-                print(f"✅ Text successfully replaced with ENHANCED BOLDNESS + INTELLIGENT POSITIONING")
-                print(f"   Font: {pymupdf_font}, Visual Boldness: {visual_boldness:.1f}, Strategy: {positioning_strategy}")
-                print(f"   Position: ({text_point.x:.2f}, {text_point.y:.2f})")
-            else:
-                pymupdf_page.insert_text(
-                    text_point,
-                    new_text,
-                    fontname=pymupdf_font,
-                    fontsize=font_size,
-                    color=original_color_normalized
-                )
-                print(f"✅ Text successfully replaced with INTELLIGENT POSITIONING + PRECISE FONT MATCHING")
-                print(f"   Font: {pymupdf_font} (was: {font_name}), Strategy: {positioning_strategy}")
-                print(f"   Size: {font_size}pt, Color: {original_color_rgb}, Position: ({text_point.x:.2f}, {text_point.y:.2f})")
-        except Exception as font_error:
-            print(f"⚠️ Font insertion failed with {pymupdf_font}: {font_error}")
-            # Fallback to default font with all enhancements preserved
-            fallback_font = "hebo" if effective_bold else "helv"
-            pymupdf_page.insert_text(
+    
+    except Exception as e:
+        logger.warning("⚠️  Intelligent positioning failed: %s", e)
+        logger.debug("🔄 Falling back to original position")
+        new_bbox = original_bbox
+        positioning_strategy = "fallback"
+    
+    # Determine effective font weight based on multiple factors
+    # High visual boldness score or explicit bold flag should result in bold text
+    effective_bold = is_bold or (visual_boldness > 50.0)
+    
+    logger.debug("🔍 BOLDNESS ANALYSIS:")
+    logger.debug("   Flag Bold: %s", is_bold)
+    logger.debug("   Visual Boldness Score: %s", visual_boldness)
+    logger.debug("   Effective Bold: %s", effective_bold)
+    
+    # Map font to PyMuPDF font with proper boldness
+    pymupdf_font = map_to_pymupdf_font(font_name, effective_bold, is_italic)
+    
+    # Get original color and spacing from metadata
+    original_color_rgb = metadata.get("color_rgb", (0, 0, 0))  # Default to black if not found
+    original_color_normalized = tuple(c/255.0 for c in original_color_rgb)  # PyMuPDF uses 0-1 range
+    
+    # Extract spacing information for better text rendering
+    char_spacing = metadata.get("char_spacing", 0.0)
+    word_spacing = metadata.get("word_spacing", 0.0)
+    
+    logger.debug("🎨 Using original color: RGB%s -> Normalized%s", original_color_rgb, original_color_normalized)
+    logger.debug("📏 Character spacing: %s, Word spacing: %s", char_spacing, word_spacing)
+    
+    # Use the intelligently calculated position for new text with baseline adjustment
+    text_baseline_y = new_bbox[3] - (font_size * 0.2)  # Adjust for font baseline
+    text_point = fitz.Point(new_bbox[0], text_baseline_y)
+    
+    logger.debug("📍 ENHANCED TEXT PLACEMENT:")
+    logger.debug("   Original bbox: %s", original_bbox)
+    logger.debug("   New bbox: %s", new_bbox)
+    logger.debug("   Text point: (%.2f, %.2f)", text_point.x, text_point.y)
+    logger.debug("   Baseline adjusted Y: %.2f", text_baseline_y)
+    logger.debug("   Font size: %s", font_size)
+    logger.debug("   Strategy: %s", positioning_strategy)
+    logger.debug("   Spacing: char=%.1f, word=%.1f", char_spacing, word_spacing)
+    
+    # Determine render mode based on boldness intensity
+    # For very high visual boldness, use stroke rendering for extra boldness
+    render_mode = 0  # Default: fill text
+    stroke_width = 0.0
+    
+    if visual_boldness > 80.0:  # Very bold text
+        render_mode = 2  # Fill and stroke for extra boldness
+        stroke_width = 0.2
+    
+    return {
+        "clear_rect": fitz.Rect(original_bbox),
+        "text_point": text_point,
+        "new_text": new_text,
+        "font": pymupdf_font,
+        "fallback_font": "hebo" if effective_bold else "helv",
+        "font_size": font_size,
+        "color": original_color_normalized,
+        "render_mode": render_mode,
+        "stroke_width": stroke_width,
+        "details": {
+            "original_text": original_text,
+            "new_text": new_text,
+            "font_used": pymupdf_font,
+            "position": original_bbox,
+            "font_size": font_size
+        }
+    }
+
+def _insert_planned_text(page: fitz.Page, plan: Dict[str, Any]) -> None:
+    """Draw a planned replacement, falling back to a Base-14 font if the mapped one fails"""
+    text_point = plan["text_point"]
+    try:
+        # Register the font on the page once; insert_text then reuses the resource by name
+        page.insert_font(fontname=plan["font"])
+    
+        if plan["render_mode"] == 2:  # Enhanced boldness with stroke
+            page.insert_text(
                 text_point,
-                new_text,
-                fontname=fallback_font,
-                fontsize=font_size,
-                color=original_color_normalized
+                plan["new_text"],
+                fontname=plan["font"],
+                fontsize=plan["font_size"],
+                color=plan["color"],
+                render_mode=plan["render_mode"],
+                stroke_width=plan["stroke_width"]
             )
-            print(f"✅ Text replaced using ENHANCED FALLBACK: {fallback_font}")
-            print(f"   Strategy: {positioning_strategy}, Size: {font_size}pt, Position: ({text_point.x:.2f}, {text_point.y:.2f})")
-        
-        # Generate modified PDF with better error handling
+            logger.debug("✅ Text successfully replaced with ENHANCED BOLDNESS + INTELLIGENT POSITIONING")
+        else:
+            page.insert_text(
+                text_point,
+                plan["new_text"],
+                fontname=plan["font"],
+                fontsize=plan["font_size"],
+                color=plan["color"]
+            )
+            logger.debug("✅ Text successfully replaced with INTELLIGENT POSITIONING + PRECISE FONT MATCHING")
+        logger.debug("   Font: %s, Size: %spt, Position: (%.2f, %.2f)", plan['font'], plan['font_size'], text_point.x, text_point.y)
+    except Exception as font_error:
+        logger.warning("⚠️ Font insertion failed with %s: %s", plan['font'], font_error)
+        # Fallback to default font with all enhancements preserved
+        page.insert_text(
+            text_point,
+            plan["new_text"],
+            fontname=plan["fallback_font"],
+            fontsize=plan["font_size"],
+            color=plan["color"]
+        )
+        logger.debug("✅ Text replaced using ENHANCED FALLBACK: %s", plan['fallback_font'])
+        plan["details"]["font_used"] = plan["fallback_font"]
+
+def _open_for_edit(file_id: str, pdf_path: str) -> Tuple[fitz.Document, str]:
+    """Copy the latest version of file_id to a fresh path and open the copy, so the edit can be appended to it
+    incrementally while readers of the current version keep an unchanged file"""
+    new_path = _new_pdf_path(file_id)
+    try:
+        shutil.copyfile(pdf_path, new_path)
+        return fitz.open(new_path), new_path
+    except Exception:
+        _remove_file(new_path)
+        raise
+
+def _discard_edit(pymupdf_doc: fitz.Document, new_path: str) -> None:
+    """Close an edit that won't be saved and delete its working copy"""
+    pymupdf_doc.close()
+    _remove_file(new_path)
+
+def _save_edited_doc(file_id: str, pymupdf_doc: fitz.Document, new_path: str) -> BinaryIO:
+    """Save an edited document (opened by _open_for_edit) as file_id's new latest version and close it.
+    Returns the new file opened for reading, so a later edit replacing it can't pull it out from under the caller."""
+    save_path = new_path
+    try:
+        if pymupdf_doc.can_save_incrementally():
+            # Append only the changed objects instead of rewriting the whole file
+            pymupdf_doc.save(new_path, incremental=True, deflate=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+        else:
+            # Repaired on open (or otherwise not appendable): write a full copy, skipping garbage collection/cleaning
+            save_path = _new_pdf_path(file_id)
+            pymupdf_doc.save(save_path, garbage=0, deflate=True, clean=False)
+            _remove_file(new_path)
+        logger.debug("📄 PDF write successful: %s bytes", os.path.getsize(save_path))
+        pdf_file = open(save_path, "rb")
+        # Following edits start from this version
+        _set_pdf_path(file_id, save_path)
+        return pdf_file
+    except Exception as write_error:
+        logger.error("❌ PDF write failed: %s", write_error)
+        _remove_file(new_path)
+        _remove_file(save_path)
+        raise HTTPException(status_code=500, detail=f"PDF generation failed: {write_error}")
+    finally:
+        # Always close the document
         try:
-            modified_pdf_bytes = pymupdf_doc.write()
-            print(f"📄 PDF write successful: {len(modified_pdf_bytes)} bytes")
-        except Exception as write_error:
-            print(f"❌ PDF write failed: {write_error}")
             pymupdf_doc.close()
-            raise HTTPException(status_code=500, detail=f"PDF generation failed: {write_error}")
-        finally:
-            # Always close the document
-            try:
-                pymupdf_doc.close()
-                print("📄 PDF document closed successfully")
-            except:
-                pass
+            logger.debug("📄 PDF document closed successfully")
+        except:
+            pass
+
+def _apply_edit(file_id: str, edit_request: EditRequest) -> Tuple[BinaryIO, Dict[str, Any]]:
+    """Apply one text edit to the file's latest PDF; returns the new version opened for reading and the edit details"""
+    logger.debug("🚀 ADVANCED EDITING: Starting text edit for file_id: %s", file_id)
+    logger.debug("📝 Edit request - page: %s, metadata_key: %s", edit_request.page, edit_request.metadata_key)
+    
+    # Read-modify-write of the cached PDF; a concurrent edit to the same file would otherwise be lost
+    with _edit_lock(file_id):
+        pdf_path, text_metadata = _load_edit_source(file_id, edit_request.text_metadata)
+    
+        # Open a working copy with PyMuPDF for text manipulation
+        pymupdf_doc, new_path = _open_for_edit(file_id, pdf_path)
+        try:
+            pymupdf_page = pymupdf_doc[edit_request.page - 1]
+            plan = _plan_edit(file_id, text_metadata, edit_request, pymupdf_page.rect.width)
+        
+            # Clear the original text by drawing a white rectangle
+            pymupdf_page.draw_rect(plan["clear_rect"], color=None, fill=_WHITE)
+            _insert_planned_text(pymupdf_page, plan)
+        except Exception:
+            _discard_edit(pymupdf_doc, new_path)
+            raise
+    
+        modified_pdf = _save_edited_doc(file_id, pymupdf_doc, new_path)
+
+    return modified_pdf, plan["details"]
+
+@app.post("/pdf/{file_id}/edit")
+def edit_text(file_id: str, edit_request: EditRequest):
+    """ADVANCED PDF text editing using precise font matching and perfect positioning"""
+    try:
+        modified_pdf, edit_details = _apply_edit(file_id, edit_request)
         
         # Encode as base64 with validation
         try:
-            modified_pdf_base64 = base64.b64encode(modified_pdf_bytes).decode('utf-8')
-            print(f"✅ Base64 encoding successful: {len(modified_pdf_base64)} chars")
+            with modified_pdf:
+                modified_pdf_base64 = _b64encode_file(modified_pdf)
+            logger.debug("✅ Base64 encoding successful: %s chars", len(modified_pdf_base64))
         except Exception as encode_error:
-            print(f"❌ Base64 encoding failed: {encode_error}")
+            logger.error("❌ Base64 encoding failed: %s", encode_error)
             raise HTTPException(status_code=500, detail=f"PDF encoding failed: {encode_error}")
         
-        print(f"✅ ADVANCED EDIT complete: Generated {len(modified_pdf_bytes)} bytes")
+        logger.info("✅ ADVANCED EDIT complete")
         
         return {
             "success": True,
-            "message": f"Text successfully edited: '{metadata['text']}' -> '{new_text}'",
+            "message": f"Text successfully edited: '{edit_details['original_text']}' -> '{edit_details['new_text']}'",
             "modifiedPdfData": modified_pdf_base64,
-            "editDetails": {
-                "original_text": metadata['text'],
-                "new_text": new_text,
-                "font_used": pymupdf_font,
-                "position": original_bbox,
-                "font_size": font_size
-            }
+            "url": f"/pdf/{file_id}/raw",
+            "editDetails": edit_details
         }
         
     except Exception as e:
-        print(f"❌ ADVANCED EDIT ERROR: {e}")
+        logger.error("❌ ADVANCED EDIT ERROR: %s", e)
         return {"success": False, "error": str(e)}
 
-@app.post("/pdf/{file_id}/download")
-async def download_pdf(file_id: str, download_request: DownloadRequest):
-    """Download the edited PDF with enhanced error handling"""
+@app.post("/pdf/{file_id}/edit-binary")
+def edit_text_binary(file_id: str, edit_request: EditRequest):
+    """Same edit as /edit, but the PDF comes back as the raw body and the details in X-Edit-Meta"""
     try:
-        print(f"📥 DOWNLOAD: Starting download for file_id: {file_id}")
+        modified_pdf, edit_details = _apply_edit(file_id, edit_request)
+        pdf_size = os.fstat(modified_pdf.fileno()).st_size
+        logger.info("✅ ADVANCED EDIT complete: Generated %s bytes", pdf_size)
         
-        # Validate PDF data
-        if not download_request.pdf_data:
-            raise HTTPException(status_code=400, detail="No PDF data provided")
+        return StreamingResponse(
+            _iter_pdf_chunks(modified_pdf),
+            media_type="application/pdf",
+            headers={"X-Edit-Meta": json.dumps(edit_details), "Content-Length": str(pdf_size)}
+        )
         
-        # Decode PDF data with validation
-        try:
-            pdf_content = base64.b64decode(download_request.pdf_data)
-            print(f"📄 PDF data decoded: {len(pdf_content)} bytes")
-        except Exception as decode_error:
-            print(f"❌ PDF decode failed: {decode_error}")
-            raise HTTPException(status_code=400, detail=f"Invalid PDF data: {decode_error}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("❌ ADVANCED EDIT ERROR: %s", e)
+        raise HTTPException(status_code=500, detail=f"Edit failed: {str(e)}")
+
+@app.post("/pdf/{file_id}/edits")
+def edit_text_batch(file_id: str, batch_request: BatchEditRequest):
+    """Apply several text edits with one PDF open and one save"""
+    logger.debug("🚀 BATCH EDITING: %s edits for file_id: %s", len(batch_request.edits), file_id)
+    try:
+        with _edit_lock(file_id):
+            pdf_path, text_metadata = _load_edit_source(file_id, batch_request.text_metadata)
         
-        # Validate PDF content
-        if len(pdf_content) < 100:  # PDF should be at least 100 bytes
-            raise HTTPException(status_code=400, detail="PDF data too small")
+            pymupdf_doc, new_path = _open_for_edit(file_id, pdf_path)
+            results = []
+            planned = []
+            try:
+                # Clear every target first, so a white box never covers text inserted by an earlier edit
+                for index, edit in enumerate(batch_request.edits):
+                    try:
+                        if not 1 <= edit.page <= pymupdf_doc.page_count:
+                            raise HTTPException(status_code=400, detail=f"Page {edit.page} out of range")
+                        pymupdf_page = pymupdf_doc[edit.page - 1]
+                        plan = _plan_edit(file_id, text_metadata, edit, pymupdf_page.rect.width)
+                        pymupdf_page.draw_rect(plan["clear_rect"], color=None, fill=_WHITE)
+                        planned.append((pymupdf_page, plan))
+                        results.append({"index": index, "success": True, "metadata_key": edit.metadata_key, "editDetails": plan["details"]})
+                    except Exception as e:
+                        detail = e.detail if isinstance(e, HTTPException) else str(e)
+                        logger.error("❌ BATCH EDIT %s (%s) failed: %s", index, edit.metadata_key, detail)
+                        if not batch_request.continue_on_error:
+                            raise
+                        results.append({"index": index, "success": False, "metadata_key": edit.metadata_key, "error": detail})
+            
+                for pymupdf_page, plan in planned:
+                    _insert_planned_text(pymupdf_page, plan)
+            except Exception:
+                _discard_edit(pymupdf_doc, new_path)
+                raise
         
-        # Verify it's a valid PDF
-        if not pdf_content.startswith(b'%PDF'):
-            raise HTTPException(status_code=400, detail="Invalid PDF format")
+            if planned:
+                modified_pdf = _save_edited_doc(file_id, pymupdf_doc, new_path)
+            else:
+                # Nothing changed, so hand back the current version without re-saving
+                _discard_edit(pymupdf_doc, new_path)
+                modified_pdf = open(pdf_path, "rb")
+
+        with modified_pdf:
+            modified_pdf_base64 = _b64encode_file(modified_pdf)
+        logger.info("✅ BATCH EDIT complete: %s/%s applied", len(planned), len(batch_request.edits))
         
-        print(f"✅ DOWNLOAD: Ready to serve {len(pdf_content)} bytes")
+        return {
+            "success": bool(planned),
+            "applied": len(planned),
+            "modifiedPdfData": modified_pdf_base64,
+            "url": f"/pdf/{file_id}/raw",
+            "results": results
+        }
         
-        return Response(
-            content=pdf_content,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=edited_{file_id}.pdf",
-                "Content-Length": str(len(pdf_content))
-            }
-        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("❌ BATCH EDIT ERROR: %s", e)
+        raise HTTPException(status_code=500, detail=f"Batch edit failed: {str(e)}")
+
+def _pdf_file_response(file_id: str, disposition: str) -> StreamingResponse:
+    """Stream the latest stored version of file_id as application/pdf"""
+    # The file is opened under the edit lock so a concurrent edit can't delete it first
+    with _edit_lock(file_id):
+        pdf_path = _cache_get(_PDF_PATHS, file_id)
+        if pdf_path is None:
+            raise HTTPException(status_code=404, detail="PDF not found, please upload it again")
+        pdf_file = open(pdf_path, "rb")
+    
+    pdf_size = os.fstat(pdf_file.fileno()).st_size
+    
+    # Validate PDF content
+    if pdf_size < 100:  # PDF should be at least 100 bytes
+        pdf_file.close()
+        raise HTTPException(status_code=400, detail="PDF data too small")
+    
+    # Verify it's a valid PDF
+    if pdf_file.read(4) != b'%PDF':
+        pdf_file.close()
+        raise HTTPException(status_code=400, detail="Invalid PDF format")
+    pdf_file.seek(0)
+    
+    logger.debug("✅ Ready to serve %s bytes", pdf_size)
+    
+    return StreamingResponse(
+        _iter_pdf_chunks(pdf_file),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"{disposition}; filename=edited_{file_id}.pdf",
+            "Content-Length": str(pdf_size)
+        }
+    )
+
+@app.post("/pdf/{file_id}/download")
+def download_pdf(file_id: str):
+    """Download the edited PDF with enhanced error handling"""
+    try:
+        logger.debug("📥 DOWNLOAD: Starting download for file_id: %s", file_id)
+        return _pdf_file_response(file_id, "attachment")
         
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        print(f"❌ DOWNLOAD ERROR: {e}")
+        logger.error("❌ DOWNLOAD ERROR: %s", e)
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
+@app.get("/pdf/{file_id}/raw")
+def get_raw_pdf(file_id: str):
+    """Latest version of the PDF as a binary body, for viewers that load it by URL"""
+    try:
+        return _pdf_file_response(file_id, "inline")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("❌ RAW PDF ERROR: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to read PDF: {str(e)}")
+
 @app.get("/pdf/{file_id}/pages/{page_num}/text")
 async def get_page_text(file_id: str, page_num: int):
     """Get text items for a specific page"""
     try:
-        print(f"📄 Getting text for file_id: {file_id}, page: {page_num}")
+        logger.debug("📄 Getting text for file_id: %s, page: %s", file_id, page_num)
         
-        if file_id not in pdf_storage:
+        text_metadata = _cache_get(_METADATA_CACHE, file_id)
+        if text_metadata is None:
             raise HTTPException(status_code=404, detail="PDF not found")
         
-        stored_data = pdf_storage[file_id]
-        text_items = stored_data.get("text_items", [])
-        text_metadata = stored_data.get("text_metadata", {})
-        
-        # Filter text items for the requested page
-        page_text_items = [item for item in text_items if item.get("page") == page_num]
+        # Metadata for the requested page, straight from the page index
+        page_metadata = _page_items(file_id, text_metadata, page_num)
         
-        # Filter metadata for the requested page
-        page_metadata = {}
-        for key, metadata in text_metadata.items():
-            if metadata.get("page") == page_num:
-                page_metadata[key] = metadata
+        # Rebuild the frontend text items from the stored metadata
+        page_text_items = [
+            {
+                "text": metadata["text"],
+                "page": metadata["page"],
+                "x": metadata["bbox"][0],
+                "y": metadata["bbox"][1],
+                "width": metadata["bbox"][2] - metadata["bbox"][0],
+                "height": metadata["bbox"][3] - metadata["bbox"][1],
+                "font": metadata["font"],
+                "size": metadata["size"],
+                "metadata_key": key,
+                "color": metadata["color"],
+                "flags": metadata["flags"],
+                "is_bold": metadata["is_bold"],
+                "is_italic": metadata["is_italic"],
+                "visual_boldness": metadata.get("visual_boldness_score", 0.0)
+            }
+            for key, metadata in page_metadata.items()
+        ]
         
-        print(f"📊 Found {len(page_text_items)} text items for page {page_num}")
+        logger.debug("📊 Found %s text items for page %s", len(page_text_items), page_num)
         
         return {
             "success": True,
@@ -917,9 +1285,20 @@ async def get_page_text(file_id: str, page_num: int):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ GET PAGE TEXT ERROR: {e}")
+        logger.error("❌ GET PAGE TEXT ERROR: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to get page text: {str(e)}")
 
+@app.get("/pdf/{file_id}/meta/{metadata_key}")
+async def get_text_metadata(file_id: str, metadata_key: str):
+    """Editing metadata for one text item, served from the server-side copy instead of the upload response"""
+    text_metadata = _cache_get(_METADATA_CACHE, file_id)
+    if text_metadata is None:
+        raise HTTPException(status_code=404, detail="PDF not found")
+    metadata = text_metadata.get(metadata_key)
+    if metadata is None:
+        raise HTTPException(status_code=404, detail=f"Metadata key '{metadata_key}' not found")
+    return {"success": True, "metadata_key": metadata_key, "metadata": metadata}
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
@@ -943,5 +1322,5 @@ def handler(request, context):
 
 if __name__ == "__main__":
     import uvicorn
-    print("🚀 Starting Advanced PDF Editor Backend...")
+    logger.info("🚀 Starting Advanced PDF Editor Backend...")
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
@@ -8,7 +8,6 @@ import threading
 import time
 import requests
 import json
-import base64
 
 # Start backend server in background
 def start_server():
@@ -45,10 +44,7 @@ def test_multiple_edits():
         print(f"✅ Upload successful! File ID: {file_id}")
         print(f"📊 Found {len(upload_data['textItems'])} text items")
         
-        # Store PDF data and metadata for edits
-        pdf_data = upload_data['pdfData']
-        text_metadata = upload_data['textMetadata']
-        
+        # The server keeps the PDF and its metadata; edits only name the item
         # Find some editable text items
         text_items = upload_data['textItems']
         edit_targets = []
@@ -73,10 +69,8 @@ def test_multiple_edits():
             new_text = f"EDITED_{edit_num}_TEST"
             edit_payload = {
                 "page": item['page'],
-                "metadata_key": f"text_item_{item_idx}",
-                "new_text": new_text,
-                "pdf_data": pdf_data,
-                "text_metadata": text_metadata
+                "metadata_key": item['metadata_key'],
+                "new_text": new_text
             }
             
             print(f"   New text: '{new_text}'")
@@ -92,14 +86,8 @@ def test_multiple_edits():
                 print(f"   ✅ Edit {edit_num} successful!")
                 successful_edits += 1
                 
-                # Update PDF data for next edit
-                edit_result = edit_response.json()
-                if 'editedPdfData' in edit_result:
-                    pdf_data = edit_result['editedPdfData']
-                
                 # Optional: Download and verify after each edit
-                download_payload = {"pdf_data": pdf_data}
-                download_response = requests.post(f"{BASE_URL}/pdf/{file_id}/download", json=download_payload)
+                download_response = requests.get(f"{BASE_URL}/pdf/{file_id}/raw")
                 if download_response.status_code == 200:
                     print(f"   ✅ Download after edit {edit_num} successful! ({len(download_response.content)} bytes)")
                 else:
@@ -114,8 +102,7 @@ def test_multiple_edits():
         
         # Step 3: Final download test
         print(f"\n📥 FINAL DOWNLOAD TEST:")
-        final_download_payload = {"pdf_data": pdf_data}
-        final_download = requests.post(f"{BASE_URL}/pdf/{file_id}/download", json=final_download_payload)
+        final_download = requests.post(f"{BASE_URL}/pdf/{file_id}/download")
         
         if final_download.status_code == 200:
             print(f"✅ Final download successful! ({len(final_download.content)} bytes)")
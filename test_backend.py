@@ -4,7 +4,6 @@ Test script to verify the enhanced PDF editing backend works correctly
 """
 
 import requests
-import base64
 import json
 
 def test_backend():
@@ -48,9 +47,7 @@ def test_backend():
                 edit_request = {
                     "page": 1,
                     "metadata_key": metadata_key,
-                    "new_text": "TESTING EDIT",
-                    "pdf_data": upload_data['pdfData'],
-                    "text_metadata": upload_data['textMetadata']
+                    "new_text": "TESTING EDIT"
                 }
                 
                 edit_response = requests.post(
@@ -62,16 +59,9 @@ def test_backend():
                     edit_data = edit_response.json()
                     print(f"✅ Edit successful: {edit_data['message']}")
                     
-                    # Test 4: Download PDF
+                    # Test 4: Download PDF (the server keeps the latest version)
                     print("\n4️⃣ Testing PDF download...")
-                    download_request = {
-                        "pdf_data": edit_data['modifiedPdfData']
-                    }
-                    
-                    download_response = requests.post(
-                        f"{base_url}/pdf/{file_id}/download",
-                        json=download_request
-                    )
+                    download_response = requests.get(f"{base_url}/pdf/{file_id}/raw")
                     
                     if download_response.status_code == 200:
                         print(f"✅ Download successful: {len(download_response.content)} bytes")
@@ -90,9 +80,7 @@ def test_backend():
                             second_edit_request = {
                                 "page": 1,
                                 "metadata_key": second_metadata_key,
-                                "new_text": "SECOND EDIT",
-                                "pdf_data": edit_data['modifiedPdfData'],  # Use edited PDF
-                                "text_metadata": upload_data['textMetadata']
+                                "new_text": "SECOND EDIT"  # Applied on top of the first edit server-side
                             }
                             
                             second_edit_response = requests.post(